@@ -1,239 +1,111 @@
-from code_generation.systematics import SystematicShift
+from code_generation.producer import Producer
+from code_generation.quantity import Quantity
+from code_generation.rules import AppendProducer
 from .producers import scalefactors as scalefactors
+from .quantities import output as q
+from .weight_variations import add_weight_shift, is_selected
 
+# evaluate all selected shape variations of the btag weight in a single loop
+# over the jets. The variations are written as additional columns
+# btag_weight__<shift> of the nominal output instead of systematic shifts.
+btag_variations_in_one_loop = False
 
-def add_btagVariations(configuration, available_sample_types):
-    #########################
-    # btagging shape uncertainties
-    #########################
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncHFUp",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_hf"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncHFDown",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "down_hf"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
+# btagging shape uncertainties, given by the name of the shift and the
+# variation of the btagging correction
+btag_shape_variations = [
+    ("btagUncHFUp", "up_hf"),
+    ("btagUncHFDown", "down_hf"),
+    ("btagUncHFstats1Up", "up_hfstats1"),
+    ("btagUncHFstats1Down", "down_hfstats1"),
+    ("btagUncHFstats2Up", "up_hfstats2"),
+    ("btagUncHFstats2Down", "down_hfstats2"),
+    ("btagUncLFUp", "up_lf"),
+    ("btagUncLFDown", "down_lf"),
+    ("btagUncLFstats1Up", "up_lfstats1"),
+    ("btagUncLFstats1Down", "down_lfstats1"),
+    ("btagUncLFstats2Up", "up_lfstats2"),
+    ("btagUncLFstats2Down", "down_lfstats2"),
+    ("btagUncCFerr1Up", "up_cferr1"),
+    ("btagUncCFerr1Down", "down_cferr1"),
+    ("btagUncCFerr2Up", "up_cferr2"),
+    ("btagUncCFerr2Down", "down_cferr2"),
+]
 
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncHFstats1Up",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_hfstats1"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncHFstats1Down",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "down_hfstats1"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncHFstats2Up",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_hfstats2"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncHFstats2Down",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "down_hfstats2"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
+def btag_variation_producer(name: str, index: int) -> Producer:
+    """
+    Producer of the column btag_weight__<name> with the entry index of the
+    btag weights evaluated by btagging_SF_variations.
+    """
+    producer = Producer(
+        name=f"btagging_SF__{name}",
+        call="{df}.Define({output}, [](const ROOT::RVec<float> &weights) "
+        + f"{{vec_open}} return weights[{index}]; {{vec_close}}, {{input_vec}})",
+        input=[q.btag_weight_variations],
+        output=[Quantity(f"{q.btag_weight.name}__{name}")],
+        scopes=["mt", "et", "tt"],
+    )
+    # tag the column as weight shift, see weight_variations.weight_column_shifts
+    producer.weight_shift = name
+    return producer
 
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncLFUp",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_lf"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncLFDown",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "down_lf"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncLFstats1Up",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_lfstats1"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncLFstats1Down",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "down_lfstats1"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncLFstats2Up",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_lfstats2"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncLFstats2Down",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "down_lfstats2"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncCFerr1Up",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_cferr1"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncCFerr1Down",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "down_cferr1"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncCFerr2Up",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_cferr2"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="btagUncCFerr2Down",
-            shift_config={
-                ("mt", "et", "tt"): {"btag_sf_variation": "down_cferr2"},
-            },
-            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
+def add_btagVariations(configuration, available_sample_types, shifts):
+    #########################
+    # btagging shape uncertainties
+    #########################
+    samples = [
+        sample
+        for sample in available_sample_types
+        if sample not in ["data", "embedding", "embedding_mc"]
+    ]
+    if btag_variations_in_one_loop:
+        selected = [
+            (name, variation)
+            for name, variation in btag_shape_variations
+            if is_selected(name, shifts)
+        ]
+        if not selected:
+            return
+        configuration.add_config_parameters(
+            ["mt", "et", "tt"],
+            {
+                "btag_sf_variations": ",".join(
+                    f'"{variation}"' for _, variation in selected
+                ),
+            },
+        )
+        # the variations are only evaluated with the nominal jets, the jet
+        # shifts ignore btagging_SF_variations and only vary the central
+        # weight of btagging_SF, see jet_variations
+        configuration.add_modification_rule(
+            ["mt", "et", "tt"],
+            AppendProducer(
+                producers=[scalefactors.btagging_SF_variations],
+                samples=samples,
+                update_output=False,
+            ),
+        )
+        # the rule also adds the outputs for the selected samples
+        configuration.add_modification_rule(
+            ["mt", "et", "tt"],
+            AppendProducer(
+                producers=[
+                    btag_variation_producer(name, index)
+                    for index, (name, _) in enumerate(selected)
+                ],
+                samples=samples,
+            ),
+        )
+        return
+    for name, variation in btag_shape_variations:
+        add_weight_shift(
+            configuration,
+            shifts,
+            name=name,
+            shift_config={
+                ("mt", "et", "tt"): {"btag_sf_variation": variation},
+            },
+            producers={("mt", "et", "tt"): scalefactors.btagging_SF},
+            samples=samples,
+        )
@@ -0,0 +1,129 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import json
+import os
+import re
+from typing import Dict, List
+
+from code_generation.configuration import Configuration
+from .config_inspection import producers as configuration_producers
+
+
+def shift_group(shift: str) -> str:
+    """
+    Name of the group of a shift, e.g. tauEs1prong0pizero for
+    __tauEs1prong0pizeroUp and __tauEs1prong0pizeroDown.
+    """
+    return re.sub(r"(Up|Down)$", "", shift.lstrip("_"))
+
+
+def producer_calls(configuration: Configuration) -> Dict[str, Dict[str, int]]:
+    """
+    Number of producer calls that are generated per scope and shift group of
+    an expanded configuration. Every producer is called once for the nominal
+    and once for every shift of its outputs.
+    """
+    calls: Dict[str, Dict[str, int]] = {}
+    for scope, scope_producers in configuration_producers(configuration).items():
+        scope_calls = calls.setdefault(scope, {"nominal": 0})
+        for producer in scope_producers:
+            scope_calls["nominal"] += 1
+            shifts = set()
+            for quantity in producer.output or []:
+                shifts.update(quantity.get_shifts(scope))
+            for shift in shifts:
+                group = shift_group(shift)
+                scope_calls[group] = scope_calls.get(group, 0) + 1
+    return calls
+
+
+def plan_translation_units(
+    configuration: Configuration, n_units: int
+) -> List[Dict[str, object]]:
+    """
+    Distribute the producer calls of all scopes and shift groups onto n_units
+    translation units of similar size. Calls of one scope and shift group are
+    kept together, unless the group is larger than the average unit, in which
+    case it is split into consecutive chunks of calls. The largest groups are
+    assigned first, each to the currently smallest unit.
+    """
+    calls = producer_calls(configuration)
+    n_units = max(1, n_units)
+    total = sum(sum(scope_calls.values()) for scope_calls in calls.values())
+    chunk_size = max(1, -(-total // n_units))
+    groups = []
+    for scope, scope_calls in calls.items():
+        for group, count in scope_calls.items():
+            for first in range(0, count, chunk_size):
+                last = min(count, first + chunk_size)
+                name = f"{scope}/{group}"
+                if count > chunk_size:
+                    name += f"[{first}:{last}]"
+                groups.append((last - first, scope, name))
+    groups.sort(reverse=True)
+    units: List[Dict[str, object]] = [
+        {"calls": 0, "groups": []} for _ in range(n_units)
+    ]
+    for count, scope, name in groups:
+        unit = min(units, key=lambda unit: unit["calls"])
+        unit["calls"] += count
+        unit["groups"].append(name)
+    return [unit for unit in units if unit["calls"] > 0]
+
+
+def generated_files(folder: str, executable_name: str, since: float) -> Dict[str, int]:
+    """
+    Sizes of the C++ sources of an executable in the output folder that were
+    written after the given time, e.g. by its code generation. The output
+    folder is shared by all executables, so only the files named after the
+    executable or placed in a folder named after it are taken into account.
+    """
+    sizes = {}
+    for root, _, files in os.walk(folder):
+        folders = os.path.relpath(root, folder).split(os.sep)
+        for filename in files:
+            if not filename.endswith((".cxx", ".cpp", ".hxx", ".h")):
+                continue
+            if (
+                executable_name not in folders
+                and os.path.splitext(filename)[0] != executable_name
+            ):
+                continue
+            filepath = os.path.join(root, filename)
+            if os.path.getmtime(filepath) >= since:
+                sizes[os.path.relpath(filepath, folder)] = os.path.getsize(filepath)
+    return sizes
+
+
+def size_report(
+    configuration: Configuration, files: Dict[str, int], n_units: int
+) -> dict:
+    """
+    Report of the generated code of an executable: the sizes of the generated
+    files, the producer calls per scope and shift group and a balanced
+    assignment of the shift groups onto n_units translation units.
+    """
+    units = plan_translation_units(configuration, n_units)
+    file_sizes = sorted(files.values())
+    total = sum(file_sizes)
+    return {
+        "files": dict(sorted(files.items(), key=lambda item: -item[1])),
+        "total_size": total,
+        "largest_file_fraction": file_sizes[-1] / total if total else 0.0,
+        "calls": producer_calls(configuration),
+        "translation_units": units,
+        "translation_unit_imbalance": (
+            max(unit["calls"] for unit in units)
+            / (sum(unit["calls"] for unit in units) / len(units))
+            if units
+            else 0.0
+        ),
+    }
+
+
+def write_size_report(
+    filename: str, configuration: Configuration, files: Dict[str, int], n_units: int
+):
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(size_report(configuration, files, n_units), f, indent=4)
@@ -1,31 +1,75 @@
 from __future__ import annotations  # needed for type annotations in > python 3.7
 
-from typing import List
+from typing import List, Union
 
-from .producers import electrons as electrons
-from .producers import event as event
-from .producers import genparticles as genparticles
-from .producers import jets as jets
-from .producers import met as met
-from .producers import muons as muons
-from .producers import pairquantities as pairquantities
-from .producers import pairselection as pairselection
-from .producers import scalefactors as scalefactors
-from .producers import taus as taus
-from .producers import triggers as triggers
+from .lazy_loading import lazy_import
 from .quantities import nanoAOD as nanoAOD
 from .quantities import output as q
-from .tau_triggersetup import add_diTauTriggerSetup
-from .tau_variations import add_tauVariations
-from .jet_variations import add_jetVariations
-from .tau_embedding_settings import setup_embedding
-from .btag_variations import add_btagVariations
-from .jec_data import add_jetCorrectionData
+from .profiling import ConfigProfiler
+from .weight_variations import add_weight_shift
 from code_generation.configuration import Configuration
 from code_generation.modifiers import EraModifier, SampleModifier
 from code_generation.rules import AppendProducer, RemoveProducer, ReplaceProducer
 from code_generation.systematics import SystematicShift, SystematicShiftByQuantity
 
+# producer modules and variation helpers are only executed when they are used
+# for the first time, so configurations that do not need some of them (e.g.
+# the embedding settings for all other samples) do not pay for constructing
+# their producers
+electrons = lazy_import(".producers.electrons", __package__)
+event = lazy_import(".producers.event", __package__)
+genparticles = lazy_import(".producers.genparticles", __package__)
+jets = lazy_import(".producers.jets", __package__)
+met = lazy_import(".producers.met", __package__)
+muons = lazy_import(".producers.muons", __package__)
+pairquantities = lazy_import(".producers.pairquantities", __package__)
+pairselection = lazy_import(".producers.pairselection", __package__)
+scalefactors = lazy_import(".producers.scalefactors", __package__)
+taus = lazy_import(".producers.taus", __package__)
+triggers = lazy_import(".producers.triggers", __package__)
+tau_triggersetup = lazy_import(".tau_triggersetup", __package__)
+tau_variations = lazy_import(".tau_variations", __package__)
+jet_variations = lazy_import(".jet_variations", __package__)
+tau_embedding_settings = lazy_import(".tau_embedding_settings", __package__)
+btag_variations = lazy_import(".btag_variations", __package__)
+jec_data = lazy_import(".jec_data", __package__)
+recoil_variations = lazy_import(".recoil_variations", __package__)
+fastmtt_precision = lazy_import(".fastmtt_precision", __package__)
+
+# reuse the nominal FastMTT result in the shifted branches for all events whose
+# FastMTT inputs are not changed by the shift, e.g. taus of other decay modes
+# for the tau energy scale shifts
+fastmtt_reuse_nominal = False
+# C++ expression of the quantities in pairquantities.fastmtt_preselection_inputs,
+# see pairquantities.fastmtt_preselection_flag. If set, FastMTT is only
+# evaluated for events passing it, all other events get the default value.
+# Cannot be combined with fastmtt_reuse_nominal.
+fastmtt_preselection = None
+
+
+def fastmtt_producers():
+    if fastmtt_preselection is not None and fastmtt_reuse_nominal:
+        raise ValueError(
+            "fastmtt_preselection cannot be combined with fastmtt_reuse_nominal"
+        )
+    if fastmtt_preselection is not None:
+        unknown = set(
+            pairquantities.fastmtt_preselection_columns(fastmtt_preselection)
+        ) - set(
+            quantity.name for quantity in pairquantities.fastmtt_preselection_inputs
+        )
+        if unknown:
+            raise ValueError(
+                "fastmtt_preselection uses the columns "
+                + f"{', '.join(sorted(unknown))}, which are not in "
+                + "pairquantities.fastmtt_preselection_inputs"
+            )
+    if fastmtt_preselection is not None:
+        return pairquantities.FastMTTQuantities_preselected
+    if fastmtt_reuse_nominal:
+        return pairquantities.FastMTTQuantities_reuseNominal
+    return pairquantities.FastMTTQuantities
+
 
 def build_config(
     era: str,
@@ -35,7 +79,11 @@ def build_config(
     available_sample_types: List[str],
     available_eras: List[str],
     available_scopes: List[str],
+    profiler: Union[ConfigProfiler, None] = None,
 ):
+    if profiler is None:
+        profiler = ConfigProfiler(enabled=False)
+    profiler.start()
     configuration = Configuration(
         era,
         sample,
@@ -673,6 +721,8 @@ def build_config(
         },
     )
 
+    profiler.checkpoint("config_parameters")
+
     configuration.add_producers(
         "global",
         [
@@ -711,11 +761,9 @@ def build_config(
             jets.BJetCollection,
             jets.PreBJetCollection,
             jets.BasicBJetQuantities,
-            scalefactors.btagging_SF,
             met.MetCorrections,
             met.PFMetCorrections,
             pairquantities.DiTauPairMETQuantities,
-            genparticles.GenMatching,
         ],
     )
     configuration.add_producers(
@@ -733,8 +781,6 @@ def build_config(
             pairselection.LVMu1Uncorrected,
             pairselection.LVMu2Uncorrected,
             pairquantities.MuMuPairQuantities,
-            genparticles.MuMuGenPairQuantities,
-            # scalefactors.MuonIDIso_SF,
             triggers.MuMuGenerateSingleMuonTriggerFlags,
         ],
     )
@@ -753,11 +799,14 @@ def build_config(
             pairselection.LVEl1Uncorrected,
             pairselection.LVEl2Uncorrected,
             pairquantities.ElElPairQuantities,
-            genparticles.ElElGenPairQuantities,
             triggers.ElElGenerateSingleElectronTriggerFlags,
             triggers.ElElGenerateDoubleMuonTriggerFlags,
         ],
     )
+    if fastmtt_preselection is not None:
+        configuration.add_config_parameters(
+            "mt", {"fastmtt_preselection": fastmtt_preselection}
+        )
     configuration.add_producers(
         "mt",
         [
@@ -777,12 +826,9 @@ def build_config(
             pairselection.LVMu1Uncorrected,
             pairselection.LVTau2Uncorrected,
             pairquantities.MTDiTauPairQuantities,
-            pairquantities.FastMTTQuantities,
-            genparticles.MTGenDiTauPairQuantities,
-            #  scalefactors.MuonIDIso_SF,
-            scalefactors.Tau_2_VsJetTauID_lt_SF,
-            scalefactors.Tau_2_VsEleTauID_SF,
-            scalefactors.Tau_2_VsMuTauID_SF,
+            fastmtt_precision.add_fastmtt_precision(
+                configuration, ["mt"], fastmtt_producers()
+            ),
             triggers.MTGenerateSingleMuonTriggerFlags,
             triggers.MTGenerateCrossTriggerFlags,
             triggers.GenerateSingleTrailingTauTriggerFlags,
@@ -807,11 +853,6 @@ def build_config(
             pairselection.LVEl1Uncorrected,
             pairselection.LVTau2Uncorrected,
             pairquantities.ETDiTauPairQuantities,
-            genparticles.ETGenDiTauPairQuantities,
-            scalefactors.Tau_2_VsJetTauID_lt_SF,
-            scalefactors.Tau_2_VsEleTauID_SF,
-            scalefactors.Tau_2_VsMuTauID_SF,
-            # scalefactors.EleID_SF,
             triggers.ETGenerateSingleElectronTriggerFlags,
             triggers.ETGenerateCrossTriggerFlags,
             triggers.GenerateSingleTrailingTauTriggerFlags,
@@ -833,13 +874,6 @@ def build_config(
             pairselection.LVTau1Uncorrected,
             pairselection.LVTau2Uncorrected,
             pairquantities.TTDiTauPairQuantities,
-            genparticles.TTGenDiTauPairQuantities,
-            scalefactors.Tau_1_VsJetTauID_SF,
-            scalefactors.Tau_1_VsEleTauID_SF,
-            scalefactors.Tau_1_VsMuTauID_SF,
-            scalefactors.Tau_2_VsJetTauID_tt_SF,
-            scalefactors.Tau_2_VsEleTauID_SF,
-            scalefactors.Tau_2_VsMuTauID_SF,
             triggers.TTGenerateDoubleTriggerFlags,
             triggers.GenerateSingleTrailingTauTriggerFlags,
             triggers.GenerateSingleLeadingTauTriggerFlags,
@@ -863,30 +897,54 @@ def build_config(
             pairselection.LVEl1Uncorrected,
             pairselection.LVMu2Uncorrected,
             pairquantities.EMDiTauPairQuantities,
-            genparticles.EMGenDiTauPairQuantities,
-            # scalefactors.MuonIDIso_SF,
-            # scalefactors.EleID_SF,
             triggers.EMGenerateSingleElectronTriggerFlags,
             triggers.EMGenerateSingleMuonTriggerFlags,
             triggers.EMGenerateCrossTriggerFlags,
         ],
     )
-    configuration.add_modification_rule(
-        ["et", "mt"],
-        RemoveProducer(
-            producers=[
+    # generator information and scale factors only exist for simulation. For
+    # data, the genparticles and scalefactors modules are not referenced at
+    # all, so that they are never imported
+    if sample != "data":
+        configuration.add_producers(
+            scopes,
+            [
+                scalefactors.btagging_SF,
+                genparticles.GenMatching,
+            ],
+        )
+        configuration.add_producers(
+            "mm",
+            [
+                genparticles.MuMuGenPairQuantities,
+                # scalefactors.MuonIDIso_SF,
+            ],
+        )
+        configuration.add_producers("ee", [genparticles.ElElGenPairQuantities])
+        configuration.add_producers(
+            "mt",
+            [
+                genparticles.MTGenDiTauPairQuantities,
+                #  scalefactors.MuonIDIso_SF,
+                scalefactors.Tau_2_VsJetTauID_lt_SF,
+                scalefactors.Tau_2_VsEleTauID_SF,
                 scalefactors.Tau_2_VsMuTauID_SF,
+            ],
+        )
+        configuration.add_producers(
+            "et",
+            [
+                genparticles.ETGenDiTauPairQuantities,
                 scalefactors.Tau_2_VsJetTauID_lt_SF,
                 scalefactors.Tau_2_VsEleTauID_SF,
+                scalefactors.Tau_2_VsMuTauID_SF,
+                # scalefactors.EleID_SF,
             ],
-            samples="data",
-        ),
-    )
-
-    configuration.add_modification_rule(
-        ["tt"],
-        RemoveProducer(
-            producers=[
+        )
+        configuration.add_producers(
+            "tt",
+            [
+                genparticles.TTGenDiTauPairQuantities,
                 scalefactors.Tau_1_VsJetTauID_SF,
                 scalefactors.Tau_1_VsEleTauID_SF,
                 scalefactors.Tau_1_VsMuTauID_SF,
@@ -894,18 +952,24 @@ def build_config(
                 scalefactors.Tau_2_VsEleTauID_SF,
                 scalefactors.Tau_2_VsMuTauID_SF,
             ],
-            samples="data",
-        ),
-    )
-    configuration.add_modification_rule(
-        scopes,
-        RemoveProducer(
-            producers=[
-                scalefactors.btagging_SF,
+        )
+        configuration.add_producers(
+            "em",
+            [
+                genparticles.EMGenDiTauPairQuantities,
+                # scalefactors.MuonIDIso_SF,
+                # scalefactors.EleID_SF,
             ],
-            samples=["data", "embedding", "embedding_mc"],
-        ),
-    )
+        )
+        configuration.add_modification_rule(
+            scopes,
+            RemoveProducer(
+                producers=[
+                    scalefactors.btagging_SF,
+                ],
+                samples=["embedding", "embedding_mc"],
+            ),
+        )
     configuration.add_modification_rule(
         ["et", "mt", "tt"],
         ReplaceProducer(
@@ -965,15 +1029,6 @@ def build_config(
             samples="data",
         ),
     )
-    configuration.add_modification_rule(
-        scopes,
-        RemoveProducer(
-            producers=[
-                genparticles.GenMatching,
-            ],
-            samples="data",
-        ),
-    )
     configuration.add_modification_rule(
         scopes,
         AppendProducer(
@@ -1014,153 +1069,114 @@ def build_config(
     )
 
     # scope specific
-    configuration.add_modification_rule(
-        "mt",
-        RemoveProducer(
-            producers=[genparticles.MTGenDiTauPairQuantities],
-            samples=["data"],
-        ),
-    )
-    configuration.add_modification_rule(
-        "et",
-        RemoveProducer(
-            producers=[genparticles.ETGenDiTauPairQuantities],
-            samples=["data"],
-        ),
-    )
-    configuration.add_modification_rule(
-        "tt",
-        RemoveProducer(
-            producers=[genparticles.TTGenDiTauPairQuantities],
-            samples=["data"],
-        ),
-    )
-    configuration.add_modification_rule(
-        "em",
-        RemoveProducer(
-            producers=[genparticles.EMGenDiTauPairQuantities],
-            samples=["data"],
-        ),
-    )
-    configuration.add_modification_rule(
-        "mm",
-        RemoveProducer(
-            producers=[genparticles.MuMuGenPairQuantities],
-            samples=["data"],
-        ),
-    )
-    configuration.add_modification_rule(
-        "ee",
-        RemoveProducer(
-            producers=[genparticles.ElElGenPairQuantities],
-            samples=["data"],
-        ),
-    )
     # lepton scalefactors from our measurement
-    configuration.add_modification_rule(
-        ["mt"],
-        AppendProducer(
-            producers=[
-                scalefactors.TauEmbeddingMuonIDSF_1_MC,
-                scalefactors.TauEmbeddingMuonIsoSF_1_MC,
-            ],
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
-        ),
-    )
-    configuration.add_modification_rule(
-        ["et"],
-        AppendProducer(
-            producers=[
-                scalefactors.TauEmbeddingElectronIDSF_1_MC,
-                scalefactors.TauEmbeddingElectronIsoSF_1_MC,
-            ],
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
-        ),
-    )
-    configuration.add_modification_rule(
-        ["em"],
-        AppendProducer(
-            producers=[
-                scalefactors.TauEmbeddingElectronIDSF_1_MC,
-                scalefactors.TauEmbeddingElectronIsoSF_1_MC,
-                scalefactors.TauEmbeddingMuonIDSF_2_MC,
-                scalefactors.TauEmbeddingMuonIsoSF_2_MC,
-            ],
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
-        ),
-    )
-    configuration.add_modification_rule(
-        ["mm"],
-        AppendProducer(
-            producers=[
-                scalefactors.TauEmbeddingMuonIDSF_1_MC,
-                scalefactors.TauEmbeddingMuonIsoSF_1_MC,
-                scalefactors.TauEmbeddingMuonIDSF_2_MC,
-                scalefactors.TauEmbeddingMuonIsoSF_2_MC,
-                scalefactors.MTGenerateSingleMuonTriggerSF_MC,
-            ],
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
-        ),
-    )
-    configuration.add_modification_rule(
-        ["ee"],
-        AppendProducer(
-            producers=[
-                scalefactors.TauEmbeddingElectronIDSF_1_MC,
-                scalefactors.TauEmbeddingElectronIsoSF_1_MC,
-                scalefactors.TauEmbeddingElectronIDSF_2_MC,
-                scalefactors.TauEmbeddingElectronIsoSF_2_MC,
-                scalefactors.ETGenerateSingleElectronTriggerSF_MC,
-            ],
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
-        ),
-    )
-    configuration.add_modification_rule(
-        ["mt"],
-        AppendProducer(
-            producers=[
-                scalefactors.MTGenerateSingleMuonTriggerSF_MC,
-            ],
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
-        ),
-    )
-    configuration.add_modification_rule(
-        ["et"],
-        AppendProducer(
-            producers=[
-                scalefactors.ETGenerateSingleElectronTriggerSF_MC,
-            ],
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
-        ),
-    )
+    if sample != "data":
+        configuration.add_modification_rule(
+            ["mt"],
+            AppendProducer(
+                producers=[
+                    scalefactors.TauEmbeddingMuonIDSF_1_MC,
+                    scalefactors.TauEmbeddingMuonIsoSF_1_MC,
+                ],
+                samples=[
+                    sample
+                    for sample in available_sample_types
+                    if sample not in ["data", "embedding", "embedding_mc"]
+                ],
+            ),
+        )
+        configuration.add_modification_rule(
+            ["et"],
+            AppendProducer(
+                producers=[
+                    scalefactors.TauEmbeddingElectronIDSF_1_MC,
+                    scalefactors.TauEmbeddingElectronIsoSF_1_MC,
+                ],
+                samples=[
+                    sample
+                    for sample in available_sample_types
+                    if sample not in ["data", "embedding", "embedding_mc"]
+                ],
+            ),
+        )
+        configuration.add_modification_rule(
+            ["em"],
+            AppendProducer(
+                producers=[
+                    scalefactors.TauEmbeddingElectronIDSF_1_MC,
+                    scalefactors.TauEmbeddingElectronIsoSF_1_MC,
+                    scalefactors.TauEmbeddingMuonIDSF_2_MC,
+                    scalefactors.TauEmbeddingMuonIsoSF_2_MC,
+                ],
+                samples=[
+                    sample
+                    for sample in available_sample_types
+                    if sample not in ["data", "embedding", "embedding_mc"]
+                ],
+            ),
+        )
+        configuration.add_modification_rule(
+            ["mm"],
+            AppendProducer(
+                producers=[
+                    scalefactors.TauEmbeddingMuonIDSF_1_MC,
+                    scalefactors.TauEmbeddingMuonIsoSF_1_MC,
+                    scalefactors.TauEmbeddingMuonIDSF_2_MC,
+                    scalefactors.TauEmbeddingMuonIsoSF_2_MC,
+                    scalefactors.MTGenerateSingleMuonTriggerSF_MC,
+                ],
+                samples=[
+                    sample
+                    for sample in available_sample_types
+                    if sample not in ["data", "embedding", "embedding_mc"]
+                ],
+            ),
+        )
+        configuration.add_modification_rule(
+            ["ee"],
+            AppendProducer(
+                producers=[
+                    scalefactors.TauEmbeddingElectronIDSF_1_MC,
+                    scalefactors.TauEmbeddingElectronIsoSF_1_MC,
+                    scalefactors.TauEmbeddingElectronIDSF_2_MC,
+                    scalefactors.TauEmbeddingElectronIsoSF_2_MC,
+                    scalefactors.ETGenerateSingleElectronTriggerSF_MC,
+                ],
+                samples=[
+                    sample
+                    for sample in available_sample_types
+                    if sample not in ["data", "embedding", "embedding_mc"]
+                ],
+            ),
+        )
+        configuration.add_modification_rule(
+            ["mt"],
+            AppendProducer(
+                producers=[
+                    scalefactors.MTGenerateSingleMuonTriggerSF_MC,
+                ],
+                samples=[
+                    sample
+                    for sample in available_sample_types
+                    if sample not in ["data", "embedding", "embedding_mc"]
+                ],
+            ),
+        )
+        configuration.add_modification_rule(
+            ["et"],
+            AppendProducer(
+                producers=[
+                    scalefactors.ETGenerateSingleElectronTriggerSF_MC,
+                ],
+                samples=[
+                    sample
+                    for sample in available_sample_types
+                    if sample not in ["data", "embedding", "embedding_mc"]
+                ],
+            ),
+        )
+
+    profiler.checkpoint("producers_and_rules")
 
     configuration.add_outputs(
         scopes,
@@ -1212,7 +1228,6 @@ def build_config(
             q.bphi_2,
             q.btag_value_1,
             q.btag_value_2,
-            q.btag_weight,
             q.mass_1,
             q.mass_2,
             q.dxy_1,
@@ -1223,17 +1238,6 @@ def build_config(
             q.q_2,
             q.iso_1,
             q.iso_2,
-            q.gen_pt_1,
-            q.gen_eta_1,
-            q.gen_phi_1,
-            q.gen_mass_1,
-            q.gen_pdgid_1,
-            q.gen_pt_2,
-            q.gen_eta_2,
-            q.gen_phi_2,
-            q.gen_mass_2,
-            q.gen_pdgid_2,
-            q.gen_m_vis,
             q.met,
             q.metphi,
             q.pfmet,
@@ -1255,8 +1259,6 @@ def build_config(
             q.pt_ttjj,
             q.mt_tot,
             q.genbosonmass,
-            q.gen_match_1,
-            q.gen_match_2,
             q.pzetamissvis_pf,
             q.mTdileptonMET_pf,
             q.mt_1_pf,
@@ -1268,20 +1270,56 @@ def build_config(
             q.jet_hemisphere,
         ],
     )
-    # add genWeight for everything but data
+    # add genWeight, the generator information and the scale factors for
+    # everything but data
     if sample != "data":
         configuration.add_outputs(
             scopes,
             nanoAOD.genWeight,
         )
+        configuration.add_outputs(
+            scopes,
+            [
+                q.btag_weight,
+                q.gen_pt_1,
+                q.gen_eta_1,
+                q.gen_phi_1,
+                q.gen_mass_1,
+                q.gen_pdgid_1,
+                q.gen_pt_2,
+                q.gen_eta_2,
+                q.gen_phi_2,
+                q.gen_mass_2,
+                q.gen_pdgid_2,
+                q.gen_m_vis,
+                q.gen_match_1,
+                q.gen_match_2,
+            ],
+        )
+        configuration.add_outputs(
+            ["mt", "et"],
+            [
+                scalefactors.Tau_2_VsJetTauID_lt_SF.output_group,
+                scalefactors.Tau_2_VsEleTauID_SF.output_group,
+                scalefactors.Tau_2_VsMuTauID_SF.output_group,
+            ],
+        )
+        configuration.add_outputs(
+            "tt",
+            [
+                scalefactors.Tau_1_VsJetTauID_SF.output_group,
+                scalefactors.Tau_1_VsEleTauID_SF.output_group,
+                scalefactors.Tau_1_VsMuTauID_SF.output_group,
+                scalefactors.Tau_2_VsJetTauID_tt_SF.output_group,
+                scalefactors.Tau_2_VsEleTauID_SF.output_group,
+                scalefactors.Tau_2_VsMuTauID_SF.output_group,
+            ],
+        )
     configuration.add_outputs(
         "mt",
         [
             q.nmuons,
             q.ntaus,
-            scalefactors.Tau_2_VsJetTauID_lt_SF.output_group,
-            scalefactors.Tau_2_VsEleTauID_SF.output_group,
-            scalefactors.Tau_2_VsMuTauID_SF.output_group,
             pairquantities.VsJetTauIDFlag_2.output_group,
             pairquantities.VsEleTauIDFlag_2.output_group,
             pairquantities.VsMuTauIDFlag_2.output_group,
@@ -1305,9 +1343,6 @@ def build_config(
         [
             q.nelectrons,
             q.ntaus,
-            scalefactors.Tau_2_VsJetTauID_lt_SF.output_group,
-            scalefactors.Tau_2_VsEleTauID_SF.output_group,
-            scalefactors.Tau_2_VsMuTauID_SF.output_group,
             pairquantities.VsJetTauIDFlag_2.output_group,
             pairquantities.VsEleTauIDFlag_2.output_group,
             pairquantities.VsMuTauIDFlag_2.output_group,
@@ -1330,12 +1365,6 @@ def build_config(
         "tt",
         [
             q.ntaus,
-            scalefactors.Tau_1_VsJetTauID_SF.output_group,
-            scalefactors.Tau_1_VsEleTauID_SF.output_group,
-            scalefactors.Tau_1_VsMuTauID_SF.output_group,
-            scalefactors.Tau_2_VsJetTauID_tt_SF.output_group,
-            scalefactors.Tau_2_VsEleTauID_SF.output_group,
-            scalefactors.Tau_2_VsMuTauID_SF.output_group,
             pairquantities.VsJetTauIDFlag_1.output_group,
             pairquantities.VsEleTauIDFlag_1.output_group,
             pairquantities.VsMuTauIDFlag_1.output_group,
@@ -1404,6 +1433,8 @@ def build_config(
                 nanoAOD.HTXS_stage1_2_fine_cat_pTjet30GeV,
             ],
         )
+    profiler.checkpoint("outputs")
+
     #########################
     # LHE Scale Weight variations
     # up is muR=2.0, muF=2.0
@@ -1610,114 +1641,25 @@ def build_config(
                 scopes=["global"],
             )
         )
-    #########################
-    # MET Recoil Shifts
-    #########################
-    configuration.add_shift(
-        SystematicShift(
-            name="metRecoilResponseUp",
-            shift_config={
-                ("et", "mt", "tt", "em", "ee", "mm"): {
-                    "apply_recoil_resolution_systematic": False,
-                    "apply_recoil_response_systematic": True,
-                    "recoil_systematic_shift_up": True,
-                    "recoil_systematic_shift_down": False,
-                },
-            },
-            producers={
-                ("et", "mt", "tt", "em", "ee", "mm"): met.ApplyRecoilCorrections
-            },
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample
-            not in [
-                "data",
-                "embedding",
-                "embedding_mc",
-            ]  # ToDo: Is this really necessary for all samples?
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="metRecoilResponseDown",
-            shift_config={
-                ("et", "mt", "tt", "em", "ee", "mm"): {
-                    "apply_recoil_resolution_systematic": False,
-                    "apply_recoil_response_systematic": True,
-                    "recoil_systematic_shift_up": False,
-                    "recoil_systematic_shift_down": True,
-                },
-            },
-            producers={
-                ("et", "mt", "tt", "em", "ee", "mm"): met.ApplyRecoilCorrections
-            },
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="metRecoilResolutionUp",
-            shift_config={
-                ("et", "mt", "tt", "em", "ee", "mm"): {
-                    "apply_recoil_resolution_systematic": True,
-                    "apply_recoil_response_systematic": False,
-                    "recoil_systematic_shift_up": True,
-                    "recoil_systematic_shift_down": False,
-                },
-            },
-            producers={
-                ("et", "mt", "tt", "em", "ee", "mm"): met.ApplyRecoilCorrections
-            },
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
-            name="metRecoilResolutionDown",
-            shift_config={
-                ("et", "mt", "tt", "em", "ee", "mm"): {
-                    "apply_recoil_resolution_systematic": True,
-                    "apply_recoil_response_systematic": False,
-                    "recoil_systematic_shift_up": False,
-                    "recoil_systematic_shift_down": True,
-                },
-            },
-            producers={
-                ("et", "mt", "tt", "em", "ee", "mm"): met.ApplyRecoilCorrections
-            },
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    recoil_variations.add_recoilVariations(
+        configuration, available_sample_types, shifts
     )
     #########################
     # Pileup Shifts
     #########################
-    configuration.add_shift(
-        SystematicShift(
-            name="PileUpUp",
-            scopes=["global"],
-            shift_config={
-                ("global"): {"PU_reweighting_variation": "up"},
-            },
-            producers={
-                "global": [
-                    event.PUweights,
-                ],
-            },
-        ),
+    add_weight_shift(
+        configuration,
+        shifts,
+        name="PileUpUp",
+        scopes=["global"],
+        shift_config={
+            ("global"): {"PU_reweighting_variation": "up"},
+        },
+        producers={
+            "global": [
+                event.PUweights,
+            ],
+        },
         samples=[
             sample
             for sample in available_sample_types
@@ -1725,19 +1667,19 @@ def build_config(
         ],
     )
 
-    configuration.add_shift(
-        SystematicShift(
-            name="PileUpDown",
-            scopes=["global"],
-            shift_config={
-                ("global"): {"PU_reweighting_variation": "down"},
-            },
-            producers={
-                "global": [
-                    event.PUweights,
-                ],
-            },
-        ),
+    add_weight_shift(
+        configuration,
+        shifts,
+        name="PileUpDown",
+        scopes=["global"],
+        shift_config={
+            ("global"): {"PU_reweighting_variation": "down"},
+        },
+        producers={
+            "global": [
+                event.PUweights,
+            ],
+        },
         samples=[
             sample
             for sample in available_sample_types
@@ -1748,8 +1690,10 @@ def build_config(
     #########################
     # Trigger shifts
     #########################
-    configuration.add_shift(
-        SystematicShift(
+    if sample != "data":
+        add_weight_shift(
+            configuration,
+            shifts,
             name="singleElectronTriggerSFUp",
             shift_config={
                 ("et"): {
@@ -1778,15 +1722,15 @@ def build_config(
                 }
             },
             producers={("et"): scalefactors.ETGenerateSingleElectronTriggerSF_MC},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
+            samples=[
+                sample
+                for sample in available_sample_types
+                if sample not in ["data", "embedding", "embedding_mc"]
+            ],
+        )
+        add_weight_shift(
+            configuration,
+            shifts,
             name="singleElectronTriggerSFDown",
             shift_config={
                 ("et"): {
@@ -1815,16 +1759,16 @@ def build_config(
                 }
             },
             producers={("et"): scalefactors.ETGenerateSingleElectronTriggerSF_MC},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
+            samples=[
+                sample
+                for sample in available_sample_types
+                if sample not in ["data", "embedding", "embedding_mc"]
+            ],
+        )
 
-    configuration.add_shift(
-        SystematicShift(
+        add_weight_shift(
+            configuration,
+            shifts,
             name="singleMuonTriggerSFUp",
             shift_config={
                 ("mt"): {
@@ -1848,15 +1792,15 @@ def build_config(
                 }
             },
             producers={("mt"): scalefactors.MTGenerateSingleMuonTriggerSF_MC},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
-    configuration.add_shift(
-        SystematicShift(
+            samples=[
+                sample
+                for sample in available_sample_types
+                if sample not in ["data", "embedding", "embedding_mc"]
+            ],
+        )
+        add_weight_shift(
+            configuration,
+            shifts,
             name="singleMuonTriggerSFDown",
             shift_config={
                 ("mt"): {
@@ -1880,46 +1824,62 @@ def build_config(
                 }
             },
             producers={("mt"): scalefactors.MTGenerateSingleMuonTriggerSF_MC},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
-    )
+            samples=[
+                sample
+                for sample in available_sample_types
+                if sample not in ["data", "embedding", "embedding_mc"]
+            ],
+        )
+    profiler.checkpoint("shifts")
     #########################
     # TauID scale factor shifts, channel dependent # Tau energy scale shifts, dm dependent
     #########################
-    add_tauVariations(configuration, sample)
+    if sample != "data":
+        tau_variations.add_tauVariations(configuration, sample, shifts)
+    profiler.checkpoint("tau_variations")
     #########################
     # Import triggersetup   #
     #########################
-    add_diTauTriggerSetup(configuration)
+    tau_triggersetup.add_diTauTriggerSetup(configuration)
+    profiler.checkpoint("trigger_setup")
     #########################
     # Add additional producers and SFs related to embedded samples
     #########################
     if sample == "embedding" or sample == "embedding_mc":
-        setup_embedding(configuration, scopes)
+        tau_embedding_settings.setup_embedding(configuration, scopes)
+    profiler.checkpoint("embedding_setup")
 
     #########################
     # Jet energy resolution and jet energy scale
     #########################
-    add_jetVariations(configuration, available_sample_types, era)
+    if sample != "data":
+        jet_variations.add_jetVariations(configuration, available_sample_types, era)
+    profiler.checkpoint("jet_variations")
 
     #########################
     # btagging scale factor shape variation
     #########################
-    add_btagVariations(configuration, available_sample_types)
+    if sample != "data":
+        btag_variations.add_btagVariations(
+            configuration, available_sample_types, shifts
+        )
+    profiler.checkpoint("btag_variations")
 
     #########################
     # Jet energy correction for data
     #########################
-    add_jetCorrectionData(configuration, era)
+    jec_data.add_jetCorrectionData(configuration, era)
+    profiler.checkpoint("jec_data")
 
     #########################
     # Finalize and validate the configuration
     #########################
     configuration.optimize()
+    profiler.checkpoint("optimize")
     configuration.validate()
+    profiler.checkpoint("validate")
     configuration.report()
-    return configuration.expanded_configuration()
+    profiler.checkpoint("report")
+    expanded_configuration = configuration.expanded_configuration()
+    profiler.checkpoint("expanded_configuration")
+    return expanded_configuration
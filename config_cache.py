@@ -0,0 +1,214 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pickle
+from functools import lru_cache
+from types import ModuleType
+from typing import TYPE_CHECKING, List, Tuple
+
+from .fresh_process import pickling_errors
+
+if TYPE_CHECKING:
+    from code_generation.configuration import Configuration
+
+
+# sources of the analysis configuration that do not influence build_config,
+# relative to its folder. generate.py only holds the switches of the code
+# generation and the scripts are never imported by a configuration, so
+# editing them keeps the cached configurations valid.
+unhashed_sources = ("generate.py", "scripts")
+
+
+@lru_cache(maxsize=None)
+def folder_hash(folder: str, excluded: Tuple[str, ...] = ()) -> str:
+    """
+    Hash of all python sources in a folder and its subfolders, except for the
+    files and subfolders in excluded, given relative to the folder.
+    """
+    hasher = hashlib.sha256()
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(
+            directory
+            for directory in dirs
+            if os.path.relpath(os.path.join(root, directory), folder) not in excluded
+        )
+        for filename in sorted(files):
+            if not filename.endswith(".py"):
+                continue
+            filepath = os.path.join(root, filename)
+            if os.path.relpath(filepath, folder) in excluded:
+                continue
+            hasher.update(os.path.relpath(filepath, folder).encode())
+            with open(filepath, "rb") as f:
+                hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+def code_generation_hash() -> str:
+    """
+    Hash of the sources of the code generation package.
+    """
+    code_generation = importlib.import_module("code_generation")
+    return folder_hash(os.path.dirname(os.path.abspath(code_generation.__file__)))
+
+
+def source_hash() -> str:
+    """
+    Hash of all python sources of the analysis configuration (configs,
+    producers and quantities) and of the code generation package, except for
+    unhashed_sources. Any change of these sources invalidates all cached
+    configurations.
+    """
+    return hashlib.sha256(
+        (
+            folder_hash(os.path.dirname(os.path.abspath(__file__)), unhashed_sources)
+            + code_generation_hash()
+        ).encode()
+    ).hexdigest()
+
+
+def cache_key(
+    configname: str,
+    era: str,
+    sample: str,
+    scopes: List[str],
+    shifts: List[str],
+    available_sample_types: List[str],
+    available_eras: List[str],
+    available_scopes: List[str],
+) -> str:
+    key = {
+        "config": configname,
+        "era": era,
+        "sample": sample,
+        "scopes": sorted(scopes),
+        "shifts": sorted(shifts),
+        "available_sample_types": sorted(available_sample_types),
+        "available_eras": sorted(available_eras),
+        "available_scopes": sorted(available_scopes),
+        "sources": source_hash(),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def cached_build_config(
+    config: ModuleType,
+    cache_folder: str,
+    era: str,
+    sample: str,
+    scopes: List[str],
+    shifts: List[str],
+    available_sample_types: List[str],
+    available_eras: List[str],
+    available_scopes: List[str],
+    logger=None,
+) -> Configuration:
+    """
+    Wrapper around the build_config function of a configuration module. The
+    expanded configuration is stored in the cache folder, keyed on the era,
+    sample, scopes, shifts and the hash of the configuration sources. If a
+    matching entry exists, it is returned without rebuilding the configuration.
+    """
+    key = cache_key(
+        config.__name__.split(".")[-1],
+        era,
+        sample,
+        scopes,
+        shifts,
+        available_sample_types,
+        available_eras,
+        available_scopes,
+    )
+    cache_file = os.path.join(cache_folder, f"{key}.pickle")
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                configuration = pickle.load(f)
+            if logger is not None:
+                logger.info(f"Using cached configuration {cache_file}")
+            return configuration
+        except (OSError, EOFError, pickle.UnpicklingError) as error:
+            if logger is not None:
+                logger.warning(f"Ignoring broken cache entry {cache_file}: {error}")
+    configuration = config.build_config(
+        era,
+        sample,
+        scopes,
+        shifts,
+        available_sample_types,
+        available_eras,
+        available_scopes,
+    )
+    os.makedirs(cache_folder, exist_ok=True)
+    # write to a temporary file first, so that parallel jobs never read a
+    # partially written cache entry
+    temporary_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_file, "wb") as f:
+            pickle.dump(configuration, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_file, cache_file)
+    except (OSError,) + pickling_errors as error:
+        if os.path.exists(temporary_file):
+            os.remove(temporary_file)
+        if logger is not None:
+            logger.warning(f"Could not cache configuration: {error}")
+    return configuration
+
+
+def _object_digest(obj, memo, stack) -> str:
+    # digest of an arbitrary python object, independent of memory addresses
+    # and of the iteration order of sets. Digests of objects that are part of
+    # a reference cycle depend on the entry point and are therefore not
+    # memoized.
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return f"{type(obj).__name__}:{obj!r}"
+    if isinstance(obj, (bytes, bytearray)):
+        return f"{type(obj).__name__}:{hashlib.sha256(obj).hexdigest()}"
+    if id(obj) in memo:
+        return memo[id(obj)]
+    if id(obj) in stack:
+        memo["cycles"] += 1
+        return "<cycle>"
+    cycles = memo["cycles"]
+    stack.add(id(obj))
+    if isinstance(obj, dict):
+        content = sorted(
+            (_object_digest(key, memo, stack), _object_digest(value, memo, stack))
+            for key, value in obj.items()
+        )
+    elif isinstance(obj, (list, tuple)):
+        content = [_object_digest(item, memo, stack) for item in obj]
+    elif isinstance(obj, (set, frozenset)):
+        content = sorted(_object_digest(item, memo, stack) for item in obj)
+    elif isinstance(obj, logging.Logger):
+        content = obj.name
+    elif hasattr(obj, "__dict__"):
+        content = _object_digest(vars(obj), memo, stack)
+    else:
+        # objects without state that can be inspected (e.g. locks), only
+        # their type is relevant
+        content = ""
+    stack.discard(id(obj))
+    digest = hashlib.sha256(
+        f"{type(obj).__qualname__}:{content}".encode()
+    ).hexdigest()
+    if memo["cycles"] == cycles:
+        memo[id(obj)] = digest
+    return digest
+
+
+def configuration_fingerprint(configuration: Configuration, *extra) -> str:
+    """
+    Fingerprint of an expanded configuration. Two configurations with the same
+    producers, outputs, shifts and parameters have the same fingerprint,
+    independent of the process they were built in. Additional inputs of the
+    code generation (e.g. templates or the number of threads) can be passed
+    as extra arguments.
+    """
+    return _object_digest(
+        (configuration, code_generation_hash()) + tuple(extra), {"cycles": 0}, set()
+    )
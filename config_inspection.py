@@ -0,0 +1,88 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import re
+from typing import Dict, List, Union
+
+from code_generation.configuration import Configuration
+from code_generation.producer import Producer, ProducerGroup
+from code_generation.quantity import Quantity
+
+TProducer = Union[Producer, ProducerGroup]
+
+# parameters are inserted into the producer calls as {name}
+parameter_pattern = re.compile(r"\{(\w+)\}")
+
+
+def unpack_producers(producers: List[TProducer], scope: str) -> List[Producer]:
+    """
+    Flatten a list of producers and producer groups of a scope into the list
+    of producers that are actually called, in the order of execution.
+    """
+    unpacked = []
+    for producer in producers:
+        if isinstance(producer, ProducerGroup):
+            unpacked.extend(unpack_producers(producer.producers[scope], scope))
+            # producer groups with a call of their own combine the outputs of
+            # their subproducers, e.g. into a mask
+            if producer.call is not None:
+                unpacked.append(producer)
+        else:
+            unpacked.append(producer)
+    return unpacked
+
+
+def producer_inputs(producer: Producer, scope: str) -> List[Quantity]:
+    """
+    Input quantities of a producer in a scope.
+    """
+    inputs = producer.input
+    if isinstance(inputs, dict):
+        inputs = inputs.get(scope, [])
+    return list(inputs or [])
+
+
+def vector_parameters(producer: Producer) -> List[str]:
+    """
+    Parameters that configure a vector producer, empty for other producers.
+    """
+    return [
+        parameter
+        for parameter in [getattr(producer, "vec_config", None)]
+        + list(getattr(producer, "vec_configs", None) or [])
+        if parameter is not None
+    ]
+
+
+def scopes(configuration: Configuration) -> List[str]:
+    """
+    Scopes of an expanded configuration, the global scope first.
+    """
+    return sorted(
+        configuration.config_parameters.keys(), key=lambda scope: scope != "global"
+    )
+
+
+def shifts(configuration: Configuration) -> Dict[str, List[str]]:
+    """
+    Names of the shifts of an expanded configuration per scope, without the
+    nominal.
+    """
+    return {
+        scope: sorted(
+            shift
+            for shift in configuration.config_parameters[scope]
+            if shift != "nominal"
+        )
+        for scope in scopes(configuration)
+    }
+
+
+def producers(configuration: Configuration) -> Dict[str, List[Producer]]:
+    """
+    Producers called in the nominal path of an expanded configuration per
+    scope.
+    """
+    return {
+        scope: unpack_producers(configuration.producers.get(scope, []), scope)
+        for scope in scopes(configuration)
+    }
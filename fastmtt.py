@@ -1,9 +1,17 @@
 from __future__ import annotations  # needed for type annotations in > python 3.7
+import os
 from typing import List, Union
+from . import fastmtt_precision as fastmtt_precision
 from .producers import pairquantities as pairquantities
 from .quantities import output as q
 from code_generation.friend_trees import FriendTreeConfiguration
 
+# folder of the persistent FastMTT caches, one per era, sample and precision.
+# If set, only events that are not in the cache are evaluated with FastMTT, see
+# fastmtt_cache.py. The new entries are merged into the cache with
+# scripts/merge_fastmtt_cache.py after the production.
+fastmtt_cache_folder = None
+
 
 def build_config(
     era: str,
@@ -27,10 +35,44 @@ def build_config(
         quantities_map,
     )
 
-    configuration.add_producers(
-        ["mt", "et", "tt", "em"],
-        [pairquantities.FastMTTQuantities],
-    )
+    if fastmtt_cache_folder is None:
+        configuration.add_producers(
+            ["mt", "et", "tt", "em"],
+            [
+                fastmtt_precision.add_fastmtt_precision(
+                    configuration,
+                    ["mt", "et", "tt", "em"],
+                    pairquantities.FastMTTQuantities,
+                )
+            ],
+        )
+    else:
+        # results of different precisions are kept in separate caches
+        cache_name = f"{era}_{sample}"
+        if fastmtt_precision.fastmtt_precision is not None:
+            cache_name += f"_{fastmtt_precision.fastmtt_precision}"
+        for scope in ["mt", "et", "tt", "em"]:
+            configuration.add_config_parameters(
+                scope,
+                {
+                    "fastmtt_cache_file": os.path.join(
+                        fastmtt_cache_folder, f"{cache_name}.fastmtt"
+                    ),
+                    "fastmtt_cache_entries_prefix": os.path.join(
+                        fastmtt_cache_folder, f"{cache_name}_{scope}.fastmtt_new"
+                    ),
+                },
+            )
+        configuration.add_producers(
+            ["mt", "et", "tt", "em"],
+            [
+                fastmtt_precision.add_fastmtt_precision(
+                    configuration,
+                    ["mt", "et", "tt", "em"],
+                    pairquantities.FastMTTQuantities_cached,
+                )
+            ],
+        )
 
     configuration.add_outputs(
         ["mt", "et", "tt", "em"],
@@ -0,0 +1,112 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import os
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# A FastMTT cache is a flat binary file of records sorted by their key, so it
+# can be memory-mapped and searched with a binary search. Files with new
+# entries written by the executables use the same record format, unsorted.
+record_dtype = np.dtype(
+    [
+        ("key", "<u8"),
+        ("pt", "<f4"),
+        ("eta", "<f4"),
+        ("phi", "<f4"),
+        ("mass", "<f4"),
+    ]
+)
+
+# inputs of the key in the order of the inputs of the p4_fastmtt producers, all
+# but the decay modes are hashed as 32 bit floats, the decay modes as 32 bit
+# integers
+key_inputs = [
+    "pt_1",
+    "pt_2",
+    "eta_1",
+    "eta_2",
+    "phi_1",
+    "phi_2",
+    "mass_1",
+    "mass_2",
+    "met",
+    "metphi",
+    "metcov00",
+    "metcov01",
+    "metcov11",
+    "tau_decaymode_1",
+    "tau_decaymode_2",
+]
+integer_key_inputs = ["tau_decaymode_1", "tau_decaymode_2"]
+
+_fnv_offset = np.uint64(0xCBF29CE484222325)
+_fnv_prime = np.uint64(0x100000001B3)
+
+
+def cache_keys(channel: str, inputs: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Keys of a set of events, given by the channel and the arrays of the
+    inputs in the order of key_inputs. The key is the 64 bit FNV-1a hash of
+    the channel name followed by the little endian bytes of the inputs.
+    """
+    if len(inputs) != len(key_inputs):
+        raise ValueError(f"expected {len(key_inputs)} inputs, got {len(inputs)}")
+    n_events = len(inputs[0])
+    columns = [
+        np.asarray(values, dtype="<i4" if name in integer_key_inputs else "<f4")
+        for name, values in zip(key_inputs, inputs)
+    ]
+    data = np.empty((n_events, 4 * len(columns)), dtype=np.uint8)
+    for index, values in enumerate(columns):
+        data[:, 4 * index : 4 * index + 4] = values.view(np.uint8).reshape(-1, 4)
+    keys = np.full(n_events, _fnv_offset, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for byte in channel.encode():
+            keys = (keys ^ np.uint64(byte)) * _fnv_prime
+        for column in range(data.shape[1]):
+            keys = (keys ^ data[:, column].astype(np.uint64)) * _fnv_prime
+    return keys
+
+
+def read_cache(filename: str) -> np.ndarray:
+    """
+    Memory-mapped records of a cache file, an empty array if the file does not
+    exist.
+    """
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return np.empty(0, dtype=record_dtype)
+    return np.memmap(filename, dtype=record_dtype, mode="r")
+
+
+def lookup(cache: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Look up keys in a cache. Returns a mask of the keys that were found and
+    the records of the found keys.
+    """
+    if len(cache) == 0:
+        return np.zeros(len(keys), dtype=bool), cache
+    positions = np.minimum(np.searchsorted(cache["key"], keys), len(cache) - 1)
+    found = cache["key"][positions] == keys
+    return found, cache[positions[found]]
+
+
+def merge_cache(filename: str, entry_files: List[str]) -> int:
+    """
+    Merge files with new entries into a cache file. Entries of later files
+    replace entries of earlier files and of the cache with the same key. The
+    cache is replaced atomically. Returns the number of entries of the cache.
+    """
+    records = [np.array(read_cache(filename))]
+    for entry_file in entry_files:
+        records.append(np.fromfile(entry_file, dtype=record_dtype))
+    merged = np.concatenate(records)
+    # keep the last entry of every key
+    order = np.argsort(merged["key"], kind="stable")[::-1]
+    _, last = np.unique(merged["key"][order], return_index=True)
+    merged = merged[order[last]]
+    temporary = f"{filename}.tmp{os.getpid()}"
+    merged.tofile(temporary)
+    os.replace(temporary, filename)
+    return len(merged)
+
@@ -0,0 +1,107 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+from typing import List
+
+from code_generation.configuration import Configuration
+from code_generation.producer import Producer, ProducerGroup
+from .config_inspection import producer_inputs
+from .producers import pairquantities as pairquantities
+
+# precision of the FastMTT likelihood scan, None keeps quantities::p4_fastmtt.
+# The fit is then evaluated inline with pairquantities.fastmtt_scan. coarse,
+# standard and fine scan a fixed grid, standard with the grid of FastMTT.
+# adaptive starts with a coarse grid, refines it only around the maximum and
+# stops once the mass changes by less than fastmtt_adaptive_tolerance relative
+# to the previous step.
+fastmtt_precision = None
+fastmtt_adaptive_tolerance = 1e-3
+
+# number of grid points per dimension and maximum number of refinements of the
+# likelihood scan per precision
+fastmtt_precisions = {
+    "coarse": (25, 0),
+    "standard": (100, 0),
+    "fine": (200, 0),
+    "adaptive": (20, 4),
+}
+
+
+def _evaluates_fit(producer: Producer, scope: str) -> bool:
+    call = producer.call or ""
+    return call.startswith("quantities::p4_fastmtt") or (
+        pairquantities.fastmtt_fit(scope, "p4") in call
+    )
+
+
+def precision_producer(producer: Producer, scope: str) -> Producer:
+    """
+    Copy of a FastMTT producer of a scope, which evaluates the fit with the
+    likelihood scan of pairquantities.fastmtt_scan. Producers calling
+    quantities::p4_fastmtt are replaced by an inline Define with the same
+    inputs, in the inline producers the fit is replaced. The copy keeps the
+    name of the producer, so that it is found like the producer itself, e.g.
+    by the recoil shifts.
+    """
+    if producer.call.startswith("quantities::p4_fastmtt"):
+        call = (
+            f"{{df}}.Define({{output}}, []({pairquantities.fastmtt_arguments()}) "
+            + "{vec_open} "
+            + pairquantities.fastmtt_scan(scope, "p4")
+            + " return p4; {vec_close}, {input_vec})"
+        )
+    else:
+        call = producer.call.replace(
+            pairquantities.fastmtt_fit(scope, "p4"),
+            pairquantities.fastmtt_scan(scope, "p4"),
+        )
+    return Producer(
+        name=producer.name,
+        call=call,
+        input=producer_inputs(producer, scope),
+        output=producer.output,
+        scopes=[scope],
+    )
+
+
+def add_fastmtt_precision(
+    configuration: Configuration, scopes: List[str], group: ProducerGroup
+) -> ProducerGroup:
+    """
+    Group of FastMTT producers evaluated with fastmtt_precision. Adds the
+    parameters of the likelihood scan to the scopes. Returns the group itself
+    if no precision is set.
+    """
+    if fastmtt_precision is None:
+        return group
+    if fastmtt_precision not in fastmtt_precisions:
+        raise ValueError(
+            f"Unknown FastMTT precision {fastmtt_precision}, "
+            + f"expected one of {list(fastmtt_precisions)}"
+        )
+    grid_points, refinements = fastmtt_precisions[fastmtt_precision]
+    configuration.add_config_parameters(
+        scopes,
+        {
+            "fastmtt_grid_points": grid_points,
+            "fastmtt_refinements": refinements,
+            "fastmtt_adaptive_tolerance": fastmtt_adaptive_tolerance,
+        },
+    )
+    return ProducerGroup(
+        name=f"{group.name}_precision",
+        call=None,
+        input=None,
+        output=None,
+        scopes=list(group.producers),
+        subproducers={
+            scope: [
+                (
+                    precision_producer(producer, scope)
+                    if _evaluates_fit(producer, scope)
+                    else producer
+                )
+                for producer in producers
+            ]
+            for scope, producers in group.producers.items()
+        },
+    )
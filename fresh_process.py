@@ -0,0 +1,105 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import traceback
+from typing import Callable, List, Sequence, Union
+
+# errors raised when pickling an expanded configuration fails, e.g. because
+# of a lambda or a module stored in one of its producers. Results that cannot
+# be pickled are not treated as failures, see run_in_fresh_processes and
+# config_cache.cached_build_config.
+pickling_errors = (pickle.PicklingError, AttributeError, TypeError)
+
+
+def _send_result(sender, function: Callable, arguments: Sequence):
+    try:
+        try:
+            result = function(*arguments)
+        except BaseException:
+            sender.send(("failed", traceback.format_exc()))
+            return
+        try:
+            sender.send(("done", result))
+        except pickling_errors as error:
+            sender.send(("unpicklable", f"{type(error).__name__}: {error}"))
+    finally:
+        sender.close()
+
+
+def _stop(running):
+    for _, process in running.values():
+        process.terminate()
+    for receiver, (_, process) in running.items():
+        process.join()
+        receiver.close()
+    running.clear()
+
+
+def run_in_fresh_processes(
+    function: Callable,
+    calls: Sequence[Sequence],
+    workers: Union[int, None] = None,
+    logger=None,
+) -> List:
+    """
+    Call function once for every tuple of arguments in calls, each call in a
+    new process forked from the current one, at most workers at a time (None
+    means one per available core). Returns the results in the order of calls.
+
+    Building a configuration applies its shifts to the producers and
+    quantities defined at module level, which are shared by all
+    configurations built in the same process. Running every build in its own
+    process, forked from a process that never built a configuration itself,
+    keeps the builds independent of each other and of their order.
+
+    Like for the configuration cache, a result that cannot be pickled is not
+    an error. Such calls are repeated in the current process once all other
+    calls are finished, which gives up the isolation for them.
+    """
+    context = multiprocessing.get_context("fork")
+    workers = max(1, workers or os.cpu_count() or 1)
+    pending = list(enumerate(calls))
+    running = {}
+    in_process = []
+    results: List = [None] * len(pending)
+    while pending or running:
+        while pending and len(running) < workers:
+            index, arguments = pending.pop(0)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_send_result, args=(sender, function, arguments)
+            )
+            process.start()
+            sender.close()
+            running[receiver] = (index, process)
+        for receiver in multiprocessing.connection.wait(list(running)):
+            index, process = running.pop(receiver)
+            try:
+                status, result = receiver.recv()
+            except EOFError:
+                status, result = "failed", None
+            receiver.close()
+            process.join()
+            if status == "unpicklable":
+                if logger is not None:
+                    logger.warning(
+                        f"The result of call {index} cannot be passed between "
+                        + f"processes ({result}), repeating it in this process"
+                    )
+                in_process.append(index)
+                continue
+            if status != "done":
+                if result is None:
+                    result = f"process exited with code {process.exitcode}"
+                _stop(running)
+                raise RuntimeError(
+                    f"{getattr(function, '__name__', function)} failed for "
+                    + f"call {index}:\n{result}"
+                )
+            results[index] = result
+    for index in in_process:
+        results[index] = function(*calls[index])
+    return results
@@ -1,84 +1,437 @@
-from os import path, makedirs
+from os import path, makedirs, cpu_count
 import importlib
+import inspect
+import json
+import time
 from code_generation.code_generation import CodeGenerator
+from .code_size import generated_files, write_size_report
+from .config_cache import cached_build_config, configuration_fingerprint
+from .config_inspection import shifts as configuration_shifts
+from .fresh_process import run_in_fresh_processes
+from .manifest import ExecutableManifest
+from .profiling import ConfigProfiler
+from .shift_planner import noop_shifts, plan_shifts, shard_shifts, write_plan
+from .weight_variations import weight_column_shifts
+from .runtime_dispatch import merge_configurations
 
+analysis_name = "tau"
 
-def run(args):
-    analysis_name = "tau"
-
-    available_samples = [
-        "ggh_htautau",
-        "ggh_hbb",
-        "vbf_htautau",
-        "vbf_hbb",
-        "rem_htautau",
-        "rem_hbb",
-        "embedding",
-        "embedding_mc",
-        "singletop",
-        "ttbar",
-        "diboson",
-        "dyjets",
-        "wjets",
-        "data",
-        "electroweak_boson",
-    ]
-    available_eras = ["2016preVFP", "2016postVFP", "2017", "2018"]
-    available_scopes = ["et", "mt", "tt", "em", "ee", "mm"]
+available_samples = [
+    "ggh_htautau",
+    "ggh_hbb",
+    "vbf_htautau",
+    "vbf_hbb",
+    "rem_htautau",
+    "rem_hbb",
+    "embedding",
+    "embedding_mc",
+    "singletop",
+    "ttbar",
+    "diboson",
+    "dyjets",
+    "wjets",
+    "data",
+    "electroweak_boson",
+]
+available_eras = ["2016preVFP", "2016postVFP", "2017", "2018"]
+available_scopes = ["et", "mt", "tt", "em", "ee", "mm"]
 
-    ## setup variables
-    shifts = set([shift.lower() for shift in args.shifts])
-    sample_group = args.sample
-    era = args.era
-    scopes = list(set([scope.lower() for scope in args.scopes]))
+# number of worker processes used if several sample/era combinations are
+# generated in one invocation, None means one worker per available core
+batch_workers = None
+# reuse expanded configurations from previous runs if neither the arguments
+# nor the configuration sources changed, see config_cache. The switches in
+# this file do not invalidate the cache.
+use_config_cache = False
+# record wall time and peak memory of the phases of build_config and write
+# them to <output>/profiling/<executable>.json, this bypasses the cache
+profile_config = False
+# write the sizes of the generated sources and a balanced split of the producer
+# calls per scope and shift group onto translation units to
+# <output>/code_size/<executable>.json, None means one unit per available core
+code_size_report = False
+translation_units = None
+# write the producers that are executed again and the columns that are
+# duplicated per shift, together with an estimate of the cost of each shift
+# relative to the nominal path, to <output>/shift_costs/<executable>.json and
+# a human readable summary to <output>/shift_costs/<executable>.txt
+shift_cost_report = False
+# split the shifts of every executable onto up to this many executables
+# <executable>_shard<i>, which all contain the nominal path. The shifts are
+# distributed by their estimated cost (see shift_planner), so that the jobs of
+# the executables have a similar runtime.
+shift_shards = 1
+# remove shifts that do not change any output column of an executable before
+# generating its code, the removed shifts are listed in
+# <output>/pruned_shifts/<executable>.json
+prune_noop_shifts = False
+# families of samples that only differ in parameters, each family is generated
+# as a single executable that is requested like a sample group, e.g.
+# --sample hbb. The sample is selected when running the executable via the
+# CROWN_SAMPLE environment variable.
+sample_families = {
+    "hbb": ["ggh_hbb", "vbf_hbb", "rem_hbb"],
+    "vboson": ["dyjets", "electroweak_boson"],
+}
+# groups of eras that are generated as a single executable, requested like an
+# era, e.g. {"Run2": ["2017", "2018"]} and --era Run2. The era is selected
+# when running the executable via the CROWN_ERA environment variable. Only
+# eras with the same producers, shifts and outputs can be combined, era
+# dependent parameters, including the entries of vector producers like the
+# trigger lists, become a lookup table indexed by the era, see
+# runtime_dispatch.merge_configurations.
+era_families = {}
 
-    ## load config
-    configname = args.config
+
+def _as_list(value):
+    # samples and eras can be given as a single name, a comma separated string
+    # or a list of names
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [item for item in value]
+
+
+def _read_file(filename):
+    with open(filename, "rb") as f:
+        return f.read()
+
+
+def _build_configuration(args, sample, era, shifts, scopes):
+    # build the expanded configuration of a single sample and era
+    executable_name = f"{args.config}_{sample}_{era}"
     config = importlib.import_module(
-        f"analysis_configurations.{analysis_name}.{configname}"
+        f"analysis_configurations.{analysis_name}.{args.config}"
     )
-    ## Setting up executable
-    executable = f"{configname}_{sample_group}_{era}.cxx"
-    args.logger.info(f"Generating code for {sample_group}...")
-    args.logger.info(f"Configuration used: {config}")
-    args.logger.info(f"Era: {era}")
-    args.logger.info(f"Shifts: {shifts}")
-    config = config.build_config(
-        era,
-        sample_group,
-        scopes,
-        shifts,
-        available_samples,
-        available_eras,
-        available_scopes,
+    if profile_config:
+        profiler = ConfigProfiler()
+        # only build functions with a profiler argument record their phases,
+        # the build of other configurations is recorded as a single phase
+        if "profiler" in inspect.signature(config.build_config).parameters:
+            configuration = config.build_config(
+                era,
+                sample,
+                scopes,
+                shifts,
+                available_samples,
+                available_eras,
+                available_scopes,
+                profiler=profiler,
+            )
+        else:
+            profiler.start()
+            configuration = config.build_config(
+                era,
+                sample,
+                scopes,
+                shifts,
+                available_samples,
+                available_eras,
+                available_scopes,
+            )
+            profiler.checkpoint("build_config")
+        profiler.write(
+            path.join(args.output, "profiling", f"{executable_name}.json"),
+            executable=executable_name,
+            config=args.config,
+            sample=sample,
+            era=era,
+            scopes=sorted(scopes),
+            shifts=sorted(shifts),
+        )
+    elif use_config_cache:
+        configuration = cached_build_config(
+            config,
+            path.join(args.output, ".config_cache"),
+            era,
+            sample,
+            scopes,
+            shifts,
+            available_samples,
+            available_eras,
+            available_scopes,
+            logger=args.logger,
+        )
+    else:
+        configuration = config.build_config(
+            era,
+            sample,
+            scopes,
+            shifts,
+            available_samples,
+            available_eras,
+            available_scopes,
+        )
+    return configuration
+
+
+def _write_json(filename, content):
+    makedirs(path.dirname(path.abspath(filename)), exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(content, f, indent=4)
+
+
+def _build_selections(args, executable_name, variants, selections, scopes):
+    # build the expanded configuration of an executable, which covers one or
+    # several sample/era variants, once for every selection of shifts.
+    # Every variant and selection is built in a fresh process, so that the
+    # shifts applied to the shared producers by one build do not leak into
+    # the others. Only configurations that cannot be pickled are built in the
+    # calling process, after all others, see run_in_fresh_processes.
+    if len(variants) > 1:
+        args.logger.info(
+            f"{executable_name} covers "
+            + ", ".join(f"{v['sample']} {v['era']}" for v in variants)
+            + ", the sample and era are selected at runtime"
+        )
+    configurations = run_in_fresh_processes(
+        _build_configuration,
+        [
+            (args, variant["sample"], variant["era"], selection, scopes)
+            for selection in selections
+            for variant in variants
+        ],
+        batch_workers,
+        logger=args.logger,
+    )
+    if len(variants) == 1:
+        return configurations
+    return [
+        merge_configurations(configurations[index : index + len(variants)], variants)
+        for index in range(0, len(configurations), len(variants))
+    ]
+
+
+def _build_variants(args, executable_name, variants, shifts, scopes):
+    # build the expanded configuration of an executable for a single
+    # selection of shifts
+    return _build_selections(args, executable_name, variants, [shifts], scopes)[0]
+
+
+def _build_shards(args, executable_name, variants, scopes, configuration, plan):
+    # split the shifts of an expanded configuration onto shift_shards
+    # configurations, which all contain the nominal path
+    shards = shard_shifts(plan, shift_shards)
+    if len(shards) < 2:
+        return [(executable_name, configuration)]
+    selections = [
+        set(shift.lstrip("_").lower() for shift in shard) for shard in shards
+    ]
+    # weight shifts written as columns are not shifts of the configuration,
+    # they are kept in the first shard
+    selections[0] |= weight_column_shifts(configuration)
+    for index, shard in enumerate(shards):
+        cost = 1.0 + sum(plan[shift]["relative_cost"] for shift in shard)
+        args.logger.info(
+            f"{executable_name}_shard{index}: {len(shard)} shifts, estimated "
+            + f"cost {cost:.2f} times the nominal"
+        )
+    configurations = _build_selections(
+        args, executable_name, variants, selections, scopes
     )
-    # create a CodeGenerator object
+    return [
+        (f"{executable_name}_shard{index}", shard_configuration)
+        for index, shard_configuration in enumerate(configurations)
+    ]
+
+
+def _generate_code(args, configuration, executable_name):
+    # generate the code of an executable, if its configuration changed since
+    # the last run, returns the cmake path and whether the code was generated
     generator = CodeGenerator(
         main_template_path=args.template,
         sub_template_path=args.subset_template,
-        configuration=config,
-        executable_name=f"{configname}_{sample_group}_{era}",
+        configuration=configuration,
+        executable_name=executable_name,
         analysis_name=analysis_name,
-        config_name=configname,
+        config_name=args.config,
         output_folder=args.output,
         threads=args.threads,
     )
     if args.debug == "true":
         generator.debug = True
-    # generate the code
-    generator.generate_code()
+    fingerprint = configuration_fingerprint(
+        configuration,
+        executable_name,
+        _read_file(args.template),
+        _read_file(args.subset_template),
+        args.threads,
+        args.debug,
+    )
+    # the fingerprint file holds the fingerprint followed by the files written
+    # by the code generation, the code is only kept if all of them still exist
+    fingerprint_file = path.join(args.output, ".fingerprints", executable_name)
+    regenerate = True
+    if path.exists(fingerprint_file):
+        with open(fingerprint_file, "r") as f:
+            lines = f.read().splitlines()
+        regenerate = (
+            len(lines) == 0
+            or lines[0] != fingerprint
+            or not path.exists(generator.get_cmake_path())
+            or not all(path.exists(path.join(args.output, file)) for file in lines[1:])
+        )
+    if regenerate:
+        generation_start = time.time()
+        generator.generate_code()
+        files = generated_files(args.output, executable_name, generation_start)
+        if code_size_report:
+            write_size_report(
+                path.join(args.output, "code_size", f"{executable_name}.json"),
+                configuration,
+                files,
+                translation_units or cpu_count() or 1,
+            )
+        makedirs(path.dirname(fingerprint_file), exist_ok=True)
+        with open(fingerprint_file, "w") as f:
+            f.write(f"{fingerprint}\n")
+            for file in sorted(files):
+                f.write(f"{file}\n")
+    else:
+        args.logger.info(f"{executable_name} is up to date, keeping generated code")
+    return generator.get_cmake_path(), regenerate
+
+
+def generate_executable(args, sample_group, era, shifts, scopes):
+    """
+    Build the configuration for a single sample/era combination and generate
+    the code of the corresponding executable, or of several executables if
+    the shifts are split into shards.
+
+    If the fingerprint of the expanded configuration (and of the templates
+    and generator settings) did not change since the last run, the previously
+    generated files are kept untouched, so that they are not recompiled.
+
+    Returns the sample group, the era, a list with the cmake path of every
+    executable and whether its code was regenerated, and the time spent in
+    build_config and in the code generation.
+    """
+    configname = args.config
+    executable_name = f"{configname}_{sample_group}_{era}"
+    args.logger.info(f"Generating code for {sample_group}...")
+    args.logger.info(f"Configuration used: {configname}")
+    args.logger.info(f"Era: {era}")
+    args.logger.info(f"Shifts: {shifts}")
+    start = time.perf_counter()
+    variants = [
+        {"sample": sample, "era": member_era}
+        for member_era in era_families.get(era, [era])
+        for sample in sample_families.get(sample_group, [sample_group])
+    ]
+    configuration = _build_variants(args, executable_name, variants, shifts, scopes)
+    plan = None
+    if shift_cost_report or shift_shards > 1 or prune_noop_shifts:
+        plan = plan_shifts(configuration)
+    if prune_noop_shifts:
+        pruned = noop_shifts(plan)
+        _write_json(
+            path.join(args.output, "pruned_shifts", f"{executable_name}.json"),
+            [shift.lstrip("_") for shift in pruned],
+        )
+        if pruned:
+            args.logger.info(
+                f"{executable_name}: removing {len(pruned)} shifts without effect "
+                + "on the outputs: "
+                + ", ".join(shift.lstrip("_") for shift in pruned)
+            )
+            plan = {
+                shift: entry for shift, entry in plan.items() if shift not in pruned
+            }
+            selection = set(shift.lstrip("_").lower() for shift in plan)
+            # rebuild the configuration with the remaining shifts selected by
+            # name, in a fresh process like every build
+            configuration = _build_variants(
+                args,
+                executable_name,
+                variants,
+                (selection | weight_column_shifts(configuration)) or {"none"},
+                scopes,
+            )
+            remaining = set().union(*configuration_shifts(configuration).values())
+            reappeared = sorted(shift for shift in pruned if shift in remaining)
+            if reappeared:
+                raise RuntimeError(
+                    f"{executable_name}: the pruned shifts "
+                    + ", ".join(shift.lstrip("_") for shift in reappeared)
+                    + " are still part of the rebuilt configuration"
+                )
+    if shift_cost_report:
+        write_plan(
+            path.join(args.output, "shift_costs", f"{executable_name}.json"), plan
+        )
+    if shift_shards > 1:
+        configurations = _build_shards(
+            args, executable_name, variants, scopes, configuration, plan
+        )
+    else:
+        configurations = [(executable_name, configuration)]
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    executables = [
+        _generate_code(args, executable_configuration, name)
+        for name, executable_configuration in configurations
+    ]
+    generation_time = time.perf_counter() - start
+
+    return (
+        sample_group,
+        era,
+        executables,
+        build_time,
+        generation_time,
+    )
+
+
+def run(args):
+    ## setup variables
+    shifts = set([shift.lower() for shift in args.shifts])
+    sample_groups = _as_list(args.sample)
+    eras = _as_list(args.era)
+    scopes = list(set([scope.lower() for scope in args.scopes]))
+    combinations = [
+        (sample_group, era) for era in eras for sample_group in sample_groups
+    ]
 
-    executable = generator.get_cmake_path()
+    ## load config once, forked processes share the imported modules
+    importlib.import_module(f"analysis_configurations.{analysis_name}.{args.config}")
 
-    # append the executable name to the files.txt file
-    # if the file does not exist, create it
-    if not path.exists(path.join(args.output, "files.txt")):
-        with open(path.join(args.output, "files.txt"), "w") as f:
-            f.write(f"{executable}\n")
+    if len(combinations) == 1:
+        results = [generate_executable(args, *combinations[0], shifts, scopes)]
     else:
-        with open(path.join(args.output, "files.txt"), "r+") as f:
-            for line in f:
-                if executable in line:
-                    break
-            else:
-                f.write(f"{executable}\n")
+        workers = min(len(combinations), batch_workers or cpu_count() or 1)
+        args.logger.info(
+            f"Generating {len(combinations)} executables using {workers} workers"
+        )
+        # every combination is generated in its own process, so that no state
+        # of one combination leaks into the next
+        results = run_in_fresh_processes(
+            generate_executable,
+            [
+                (args, sample_group, era, shifts, scopes)
+                for sample_group, era in combinations
+            ],
+            workers,
+            logger=args.logger,
+        )
+
+    # add the executables to the files.txt file
+    manifest = ExecutableManifest(args.output)
+    regenerated = []
+    n_executables = 0
+    for result in results:
+        sample_group, era, executables, build_time, generation_time = result
+        unchanged = True
+        for executable, regenerate in executables:
+            manifest.register(executable)
+            n_executables += 1
+            if regenerate:
+                regenerated.append(executable)
+                unchanged = False
+        args.logger.info(
+            f"{sample_group} {era}: build_config {build_time:.1f} s, "
+            + f"code generation {generation_time:.1f} s"
+            + (" (unchanged)" if unchanged else "")
+        )
+    args.logger.info(
+        f"Regenerated {len(regenerated)} of {n_executables} executables: "
+        + (", ".join(regenerated) if regenerated else "none")
+    )
@@ -1,8 +1,8 @@
-from os import path, makedirs
 import importlib
 from code_generation.code_generation import CodeGenerator
 from code_generation.friend_trees import FriendTreeConfiguration
 import inspect
+from .manifest import ExecutableManifest
 
 
 def run(args):
@@ -59,6 +59,7 @@ def run(args):
     args.logger.info(f"Era: {era}")
     args.logger.info(f"Shifts: {shifts}")
     args.logger.info(f"Scopes: {scopes}")
+    manifest = ExecutableManifest(args.output)
     for scope in scopes:
         code_generation_config = config.build_config(
             era,
@@ -93,15 +94,5 @@ def run(args):
 
         executable = generator.get_cmake_path()
 
-        # append the executable name to the files.txt file
-        # if the file does not exist, create it
-        if not path.exists(path.join(args.output, "files.txt")):
-            with open(path.join(args.output, "files.txt"), "w") as f:
-                f.write(f"{executable}\n")
-        else:
-            with open(path.join(args.output, "files.txt"), "r+") as f:
-                for line in f:
-                    if executable in line:
-                        break
-                else:
-                    f.write(f"{executable}\n")
+        # add the executable name to the files.txt file
+        manifest.register(executable)
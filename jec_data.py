@@ -1,155 +1,71 @@
 from code_generation.configuration import Configuration
+from code_generation.rules import ReplaceProducer
 from code_generation.systematics import SystematicShift
 from .producers import jets as jets
 
+# select the JES tag of every data event from its run number in a single jet
+# energy correction, instead of adding one shift per run period
+run_dependent_jec = False
+
+# run periods of the jet energy corrections for data, given by the name of the
+# shift, the first run of the period and the JES tag
+jec_data_run_periods = {
+    "2018": [
+        ("jec2018A", 315252, "Summer19UL18_RunA_V5_DATA"),
+        ("jec2018B", 316998, "Summer19UL18_RunB_V5_DATA"),
+        ("jec2018C", 319313, "Summer19UL18_RunC_V5_DATA"),
+        ("jec2018D", 320394, "Summer19UL18_RunD_V5_DATA"),
+    ],
+    "2017": [
+        ("jec2017B", 297020, "Summer19UL17_RunB_V5_DATA"),
+        ("jec2017C", 299337, "Summer19UL17_RunC_V5_DATA"),
+        ("jec2017D", 302030, "Summer19UL17_RunD_V5_DATA"),
+        ("jec2017E", 303435, "Summer19UL17_RunE_V5_DATA"),
+        ("jec2017F", 304911, "Summer19UL17_RunF_V5_DATA"),
+    ],
+    "2016postVFP": [
+        ("jec2016FGHpostVFP", 278769, "Summer19UL16_RunFGH_V7_DATA"),
+    ],
+    "2016preVFP": [
+        ("jec2016BCDpreVFP", 272007, "Summer19UL16APV_RunBCD_V7_DATA"),
+        ("jec2016EFpreVFP", 276831, "Summer19UL16APV_RunEF_V7_DATA"),
+    ],
+}
+
 
 def add_jetCorrectionData(configuration: Configuration, era: str):
     #########################
     # Jet energy corrections for data
     #########################
-    if era == "2018":
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2018A",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL18_RunA_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
-        )
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2018B",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL18_RunB_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
-        )
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2018C",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL18_RunC_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
-        )
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2018D",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL18_RunD_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
-        )
-
-    if era == "2017":
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2017B",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL17_RunB_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
-        )
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2017C",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL17_RunC_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
-        )
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2017D",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL17_RunD_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
+    periods = jec_data_run_periods.get(era, [])
+    if run_dependent_jec:
+        configuration.add_config_parameters(
+            "global",
+            {
+                "jet_jes_first_runs_data": ",".join(
+                    str(first_run) for _, first_run, _ in periods
+                ),
+                "jet_jes_tags_data": ",".join(f'"{tag}"' for _, _, tag in periods),
+            },
         )
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2017E",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL17_RunE_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
+        configuration.add_modification_rule(
+            "global",
+            ReplaceProducer(
+                producers=[
+                    jets.JetEnergyCorrection_data,
+                    jets.JetEnergyCorrection_data_runDependent,
+                ],
+                samples="data",
             ),
-            samples=["data"],
-        )
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2017F",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL17_RunF_V5_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
-        )
-    if era == "2016postVFP":
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2016FGHpostVFP",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL16_RunFGH_V7_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
-        )
-    if era == "2016preVFP":
-        configuration.add_shift(
-            SystematicShift(
-                name="jec2016BCDpreVFP",
-                shift_config={
-                    "global": {
-                        "jet_jes_tag_data": '"Summer19UL16APV_RunBCD_V7_DATA"',
-                    },
-                },
-                producers={"global": jets.JetEnergyCorrection_data},
-            ),
-            samples=["data"],
         )
+        return
+    for name, _, tag in periods:
         configuration.add_shift(
             SystematicShift(
-                name="jec2016EFpreVFP",
+                name=name,
                 shift_config={
                     "global": {
-                        "jet_jes_tag_data": '"Summer19UL16APV_RunEF_V7_DATA"',
+                        "jet_jes_tag_data": f'"{tag}"',
                     },
                 },
                 producers={"global": jets.JetEnergyCorrection_data},
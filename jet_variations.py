@@ -1,31 +1,97 @@
 from __future__ import annotations  # needed for type annotations in > python 3.7
 
-from typing import List
+from typing import Any, Dict, List, Union
 from code_generation.configuration import Configuration
+from code_generation.rules import ReplaceProducer
 from code_generation.systematics import SystematicShift
 from .producers import jets as jets
 from .producers import scalefactors as scalefactors
+from . import btag_variations as btag_variations
+
+# evaluate the JES uncertainty sources of all shifts in one loop over the
+# jets, based on the nominal corrected jets. The jets are corrected and
+# smeared only once and the shifts only select their variation.
+batched_jes_variations = False
+
+
+def _add_jes_shift(
+    configuration: Configuration,
+    name: str,
+    jes_shift: int,
+    sources: str,
+    samples: List[str],
+    source_groups: List[str],
+    shift_config: Union[Dict[Any, Dict[str, Any]], None] = None,
+    producers: Union[Dict[Any, Any], None] = None,
+):
+    # add a shift of the jet energy scale by jes_shift standard deviations of
+    # the uncertainty sources, additional parameters and producers of other
+    # scopes can be given as for a SystematicShift. For batched variations
+    # the sources are collected in source_groups.
+    shift_config = dict(shift_config or {})
+    producers = dict(producers or {})
+    if batched_jes_variations:
+        if sources not in source_groups:
+            source_groups.append(sources)
+        variation = 2 * source_groups.index(sources) + (0 if jes_shift > 0 else 1)
+        shift_config["global"] = {"jet_jes_variation": variation}
+        producers["global"] = jets.JetEnergyCorrection_fromJesVariations
+    else:
+        shift_config["global"] = {
+            "jet_jes_shift": jes_shift,
+            "jet_jes_sources": sources,
+        }
+        producers["global"] = jets.JetEnergyCorrection
+    configuration.add_shift(
+        SystematicShift(
+            name=name,
+            shift_config=shift_config,
+            producers=producers,
+            ignore_producers=_ignored_producers(),
+        ),
+        samples=samples,
+    )
+
+
+def _ignored_producers() -> Dict[Any, Any]:
+    # producers that are not evaluated again in the jet shifts, the btag
+    # shape variations are only evaluated with the nominal jets
+    if btag_variations.btag_variations_in_one_loop:
+        return {("mt", "et", "tt"): [scalefactors.btagging_SF_variations]}
+    return {}
 
 
 def add_jetVariations(
     configuration: Configuration, available_sample_types: List[str], era: str
 ):
+    samples = [
+        sample
+        for sample in available_sample_types
+        if sample not in ["data", "embedding", "embedding_mc"]
+    ]
+    source_groups: List[str] = []
     #########################
     # Jet energy resolution
     #########################
+    # for batched JES variations, the JER shifts vary the nominal jets of the
+    # batched variations. The JES variations are not evaluated again in the
+    # JER branches, as the JER shifts select the nominal jets anyway.
+    if batched_jes_variations:
+        jer_producers = {"global": jets.JetPtCorrection_jesNominal}
+        jer_ignored_producers = {"global": [jets.JetPtCorrection_jesVariations]}
+    else:
+        jer_producers = {"global": jets.JetEnergyCorrection}
+        jer_ignored_producers = {}
     configuration.add_shift(
         SystematicShift(
             name="jerUncUp",
             shift_config={
                 "global": {"jet_jer_shift": '"up"'},
             },
-            producers={"global": jets.JetEnergyCorrection},
+            producers=jer_producers,
+            ignore_producers={**_ignored_producers(), **jer_ignored_producers},
         ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+        samples=samples,
     )
     configuration.add_shift(
         SystematicShift(
@@ -33,102 +99,55 @@ def add_jetVariations(
             shift_config={
                 "global": {"jet_jer_shift": '"down"'},
             },
-            producers={"global": jets.JetEnergyCorrection},
+            producers=jer_producers,
+            ignore_producers={**_ignored_producers(), **jer_ignored_producers},
         ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+        samples=samples,
     )
     #########################
     # Jet energy scale - Total
     #########################
     JEC_sources = '{"Total"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncTotalUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                },
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_jes"},
-            },
-            producers={
-                "global": {
-                    jets.JetEnergyCorrection,
-                },
-                ("mt", "et", "tt"): {scalefactors.btagging_SF},
-            },
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncTotalUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
+        shift_config={("mt", "et", "tt"): {"btag_sf_variation": "up_jes"}},
+        producers={("mt", "et", "tt"): {scalefactors.btagging_SF}},
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncTotalDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                },
-                ("mt", "et", "tt"): {"btag_sf_variation": "up_jes"},
-            },
-            producers={
-                "global": {
-                    jets.JetEnergyCorrection,
-                },
-                ("mt", "et", "tt"): {scalefactors.btagging_SF},
-            },
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncTotalDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
+        shift_config={("mt", "et", "tt"): {"btag_sf_variation": "up_jes"}},
+        producers={("mt", "et", "tt"): {scalefactors.btagging_SF}},
     )
     #########################
     # HEM 15/16 issue
     #########################
     if era == "2018":
         JEC_sources = '{"HEMIssue"}'
-        configuration.add_shift(
-            SystematicShift(
-                name="jesUncHEMIssueUp",
-                shift_config={
-                    "global": {
-                        "jet_jes_shift": 1,
-                        "jet_jes_sources": JEC_sources,
-                    }
-                },
-                producers={"global": jets.JetEnergyCorrection},
-            ),
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
+        _add_jes_shift(
+            configuration,
+            name="jesUncHEMIssueUp",
+            jes_shift=1,
+            sources=JEC_sources,
+            samples=samples,
+            source_groups=source_groups,
         )
-        configuration.add_shift(
-            SystematicShift(
-                name="jesUncHEMIssueDown",
-                shift_config={
-                    "global": {
-                        "jet_jes_shift": -1,
-                        "jet_jes_sources": JEC_sources,
-                    }
-                },
-                producers={"global": jets.JetEnergyCorrection},
-            ),
-            samples=[
-                sample
-                for sample in available_sample_types
-                if sample not in ["data", "embedding", "embedding_mc"]
-            ],
+        _add_jes_shift(
+            configuration,
+            name="jesUncHEMIssueDown",
+            jes_shift=-1,
+            sources=JEC_sources,
+            samples=samples,
+            source_groups=source_groups,
         )
     #########################
     # Jet energy scale - individual
@@ -1163,399 +1182,220 @@ def add_jetVariations(
     # Jet energy scale - reduced set
     #########################
     JEC_sources = '{"SinglePionECAL", "SinglePionHCAL", "AbsoluteMPFBias", "AbsoluteScale", "Fragmentation", "PileUpDataMC", "RelativeFSR", "PileUpPtRef"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncAbsoluteUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncAbsoluteUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncAbsoluteDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncAbsoluteDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"AbsoluteStat", "TimePtEta", "RelativeStatFSR"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncAbsoluteYearUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncAbsoluteYearUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncAbsoluteYearDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncAbsoluteYearDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"FlavorQCD"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncFlavorQCDUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncFlavorQCDUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncFlavorQCDDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncFlavorQCDDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"PileUpPtEC1", "PileUpPtBB", "RelativePtBB"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncBBEC1Up",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncBBEC1Up",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncBBEC1Down",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncBBEC1Down",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"RelativeJEREC1", "RelativePtEC1", "RelativeStatEC"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncBBEC1YearUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncBBEC1YearUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncBBEC1YearDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncBBEC1YearDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"RelativePtHF", "PileUpPtHF", "RelativeJERHF"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncHFUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncHFUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncHFDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncHFDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"RelativeStatHF"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncHFYearUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncHFYearUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncHFYearDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncHFYearDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"PileUpPtEC2"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncEC2Up",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncEC2Up",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncEC2Down",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncEC2Down",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"RelativeJEREC2", "RelativePtEC2"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncEC2YearUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncEC2YearUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncEC2YearDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncEC2YearDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"RelativeBal"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncRelativeBalUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncRelativeBalUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncRelativeBalDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncRelativeBalDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
     JEC_sources = '{"RelativeSample"}'
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncRelativeSampleYearUp",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": 1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncRelativeSampleYearUp",
+        jes_shift=1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
-    configuration.add_shift(
-        SystematicShift(
-            name="jesUncRelativeSampleYearDown",
-            shift_config={
-                "global": {
-                    "jet_jes_shift": -1,
-                    "jet_jes_sources": JEC_sources,
-                }
-            },
-            producers={"global": jets.JetEnergyCorrection},
-        ),
-        samples=[
-            sample
-            for sample in available_sample_types
-            if sample not in ["data", "embedding", "embedding_mc"]
-        ],
+    _add_jes_shift(
+        configuration,
+        name="jesUncRelativeSampleYearDown",
+        jes_shift=-1,
+        sources=JEC_sources,
+        samples=samples,
+        source_groups=source_groups,
     )
 
+    if batched_jes_variations and source_groups:
+        configuration.add_config_parameters(
+            "global",
+            {
+                "jet_jes_source_groups": "{" + ", ".join(source_groups) + "}",
+                "jet_jes_variation": -1,
+            },
+        )
+        configuration.add_modification_rule(
+            "global",
+            ReplaceProducer(
+                producers=[
+                    jets.JetEnergyCorrection,
+                    jets.JetEnergyCorrection_batchedJes,
+                ],
+                samples=samples,
+            ),
+        )
+
     return configuration
@@ -0,0 +1,31 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str, package: str) -> ModuleType:
+    """
+    Import a module, but only execute it when one of its attributes is
+    accessed for the first time. The module is registered in sys.modules and
+    in its parent package, so later regular imports of the same module (e.g.
+    "from .producers import jets as jets" in a helper module) return the lazy
+    module without executing it. Modules that are already imported are
+    returned as they are.
+    """
+    fullname = importlib.util.resolve_name(name, package)
+    if fullname in sys.modules:
+        return sys.modules[fullname]
+    parent_name, _, child_name = fullname.rpartition(".")
+    parent = importlib.import_module(parent_name) if parent_name else None
+    spec = importlib.util.find_spec(fullname)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {fullname!r}", name=fullname)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[fullname] = module
+    if parent is not None:
+        setattr(parent, child_name, module)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,55 @@
+import fcntl
+import os
+
+
+class ExecutableManifest:
+    """
+    Index of the executables listed in the files.txt of an output folder.
+
+    The file is only ever appended to. Every process keeps an in-memory index
+    of the entries it has seen and the position up to which the file was
+    read, so registering an executable only reads the entries that were added
+    by other processes in the meantime. All reads and writes happen while
+    holding an exclusive lock on the file, so parallel generation jobs
+    neither lose nor duplicate entries.
+    """
+
+    def __init__(self, output_folder: str, filename: str = "files.txt"):
+        self.filepath = os.path.join(output_folder, filename)
+        self.executables = {}
+        self._offset = 0
+
+    def _read_new_entries(self, f):
+        f.seek(self._offset)
+        for line in f.read().splitlines():
+            if line.strip():
+                self.executables[line.strip()] = None
+        self._offset = f.tell()
+
+    def register(self, executable: str) -> bool:
+        """
+        Add an executable to the manifest. Returns False if it was already
+        registered.
+        """
+        if executable in self.executables:
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(self.filepath)), exist_ok=True)
+        with open(self.filepath, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._read_new_entries(f)
+                if executable in self.executables:
+                    return False
+                f.write(f"{executable}\n")
+                f.flush()
+                self.executables[executable] = None
+                self._offset = f.tell()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return True
+
+    def __contains__(self, executable: str) -> bool:
+        return executable in self.executables
+
+    def __len__(self) -> int:
+        return len(self.executables)
@@ -263,3 +263,111 @@ Tau_2_VsJetTauID_tt_SF = ExtendedVectorProducer(
     scope=["tt"],
     vec_config="vsjet_tau_id_sf_embedding",
 )
+
+###############################
+# Tau energy scale scan for the measurement. All scale points are evaluated
+# in the nominal event loop and written as arrays with one entry per point,
+# the scale factors are taken from tau_ES_scan_factors.
+###############################
+
+TauESScan_pt_2 = Producer(
+    name="TauESScan_pt_2",
+    call="{df}.Define({output}, [](const float pt) {vec_open} const ROOT::RVec<float> factors{vec_open}{tau_ES_scan_factors}{vec_close}; return ROOT::RVec<float>(factors * pt); {vec_close}, {input_vec})",
+    input=[q.pt_2],
+    output=[q.tauES_scan_pt_2],
+    scopes=["mt"],
+)
+TauESScan_m_vis = Producer(
+    name="TauESScan_m_vis",
+    call="{df}.Define({output}, [](const ROOT::Math::PtEtaPhiMVector &p4_1, const ROOT::Math::PtEtaPhiMVector &p4_2) {vec_open} const ROOT::RVec<float> factors{vec_open}{tau_ES_scan_factors}{vec_close}; ROOT::RVec<float> m_vis(factors.size()); for (std::size_t i = 0; i < factors.size(); ++i) m_vis[i] = (p4_1 + factors[i] * p4_2).M(); return m_vis; {vec_close}, {input_vec})",
+    input=[q.p4_1, q.p4_2],
+    output=[q.tauES_scan_m_vis],
+    scopes=["mt"],
+)
+TauESScan_tau_pt_flag = Producer(
+    name="TauESScan_tau_pt_flag",
+    call="{df}.Define({output}, [](const float pt) {vec_open} const ROOT::RVec<float> factors{vec_open}{tau_ES_scan_factors}{vec_close}; return ROOT::RVec<int>(factors * pt > {tau_ES_scan_min_tau_pt}); {vec_close}, {input_vec})",
+    input=[q.pt_2],
+    output=[q.tauES_scan_tau_pt_flag],
+    scopes=["mt"],
+)
+TauESScan = ProducerGroup(
+    name="TauESScan",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["mt"],
+    subproducers=[
+        TauESScan_pt_2,
+        TauESScan_m_vis,
+        TauESScan_tau_pt_flag,
+    ],
+)
+
+###############################
+# Electron energy scale scan for the measurement. The same scale is applied to
+# all electrons, the scale factors are taken from ele_ES_scan_factors. In the
+# et and em scopes the electron is the first leg of the pair, in the ee scope
+# both legs are electrons.
+###############################
+
+EleESScan_pt_1 = Producer(
+    name="EleESScan_pt_1",
+    call="{df}.Define({output}, [](const float pt) {vec_open} const ROOT::RVec<float> factors{vec_open}{ele_ES_scan_factors}{vec_close}; return ROOT::RVec<float>(factors * pt); {vec_close}, {input_vec})",
+    input=[q.pt_1],
+    output=[q.eleES_scan_pt_1],
+    scopes=["et", "em", "ee"],
+)
+EleESScan_pt_2 = Producer(
+    name="EleESScan_pt_2",
+    call="{df}.Define({output}, [](const float pt) {vec_open} const ROOT::RVec<float> factors{vec_open}{ele_ES_scan_factors}{vec_close}; return ROOT::RVec<float>(factors * pt); {vec_close}, {input_vec})",
+    input=[q.pt_2],
+    output=[q.eleES_scan_pt_2],
+    scopes=["ee"],
+)
+EleESScan_m_vis = Producer(
+    name="EleESScan_m_vis",
+    call="{df}.Define({output}, [](const ROOT::Math::PtEtaPhiMVector &p4_1, const ROOT::Math::PtEtaPhiMVector &p4_2) {vec_open} const ROOT::RVec<float> factors{vec_open}{ele_ES_scan_factors}{vec_close}; ROOT::RVec<float> m_vis(factors.size()); for (std::size_t i = 0; i < factors.size(); ++i) m_vis[i] = (factors[i] * p4_1 + p4_2).M(); return m_vis; {vec_close}, {input_vec})",
+    input=[q.p4_1, q.p4_2],
+    output=[q.eleES_scan_m_vis],
+    scopes=["et", "em"],
+)
+# with both legs scaled by the same factor, the visible mass scales linearly
+EleESScan_m_vis_ee = Producer(
+    name="EleESScan_m_vis_ee",
+    call="{df}.Define({output}, [](const float m_vis) {vec_open} const ROOT::RVec<float> factors{vec_open}{ele_ES_scan_factors}{vec_close}; return ROOT::RVec<float>(factors * m_vis); {vec_close}, {input_vec})",
+    input=[q.m_vis],
+    output=[q.eleES_scan_m_vis],
+    scopes=["ee"],
+)
+EleESScan_electron_pt_flag = Producer(
+    name="EleESScan_electron_pt_flag",
+    call="{df}.Define({output}, [](const float pt) {vec_open} const ROOT::RVec<float> factors{vec_open}{ele_ES_scan_factors}{vec_close}; return ROOT::RVec<int>(factors * pt > {ele_ES_scan_min_electron_pt}); {vec_close}, {input_vec})",
+    input=[q.pt_1],
+    output=[q.eleES_scan_electron_pt_flag],
+    scopes=["et", "em"],
+)
+EleESScan_electron_pt_flag_ee = Producer(
+    name="EleESScan_electron_pt_flag_ee",
+    call="{df}.Define({output}, [](const float pt_1, const float pt_2) {vec_open} const ROOT::RVec<float> factors{vec_open}{ele_ES_scan_factors}{vec_close}; return ROOT::RVec<int>(factors * pt_1 > {ele_ES_scan_min_electron_pt} && factors * pt_2 > {ele_ES_scan_min_electron_pt}); {vec_close}, {input_vec})",
+    input=[q.pt_1, q.pt_2],
+    output=[q.eleES_scan_electron_pt_flag],
+    scopes=["ee"],
+)
+EleESScan = ProducerGroup(
+    name="EleESScan",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["et", "em", "ee"],
+    subproducers={
+        "et": [EleESScan_pt_1, EleESScan_m_vis, EleESScan_electron_pt_flag],
+        "em": [EleESScan_pt_1, EleESScan_m_vis, EleESScan_electron_pt_flag],
+        "ee": [
+            EleESScan_pt_1,
+            EleESScan_pt_2,
+            EleESScan_m_vis_ee,
+            EleESScan_electron_pt_flag_ee,
+        ],
+    },
+)
@@ -78,6 +78,64 @@ JetEnergyCorrection = ProducerGroup(
     scopes=["global"],
     subproducers=[JetPtCorrection, JetMassCorrection],
 )
+# batched evaluation of the JES uncertainties: the jets are corrected once
+# and the up and down variations of all groups of sources in
+# jet_jes_source_groups are evaluated in one loop based on the nominal jets,
+# sharing the JER smearing and the nominal JES. The shifts only select their
+# variation via jet_jes_variation, -1 selects the nominal jets.
+JetPtCorrection_jesNominal = Producer(
+    name="JetPtCorrection_jesNominal",
+    call="physicsobject::jet::JetPtCorrection({df}, {output}, {input}, {jet_reapplyJES}, {jet_jes_sources}, {jet_jes_shift}, {jet_jer_shift}, {jet_jec_file}, {jet_jer_tag}, {jet_jes_tag}, {jet_jec_algo})",
+    input=[
+        nanoAOD.Jet_pt,
+        nanoAOD.Jet_eta,
+        nanoAOD.Jet_phi,
+        nanoAOD.Jet_area,
+        nanoAOD.Jet_rawFactor,
+        nanoAOD.Jet_ID,
+        nanoAOD.GenJet_pt,
+        nanoAOD.GenJet_eta,
+        nanoAOD.GenJet_phi,
+        nanoAOD.rho,
+    ],
+    output=[q.Jet_pt_corrected_nominal],
+    scopes=["global"],
+)
+JetPtCorrection_jesVariations = Producer(
+    name="JetPtCorrection_jesVariations",
+    call='{df}.Define({output}, [groups = std::vector<std::vector<std::string>>{jet_jes_source_groups}, evaluators = [](const std::string &file, const std::vector<std::vector<std::string>> &groups, const std::string &tag, const std::string &algo) {vec_open} auto cset = correction::CorrectionSet::from_file(file); std::vector<std::vector<correction::Correction::Ref>> refs(groups.size()); for (std::size_t g = 0; g < groups.size(); ++g) for (const auto &source : groups[g]) if (source != "HEMIssue") refs[g].push_back(cset->at(tag + "_" + source + "_" + algo)); return refs; {vec_close}({jet_jec_file}, std::vector<std::vector<std::string>>{jet_jes_source_groups}, {jet_jes_tag}, {jet_jec_algo})](const ROOT::RVec<float> &pt, const ROOT::RVec<float> &eta, const ROOT::RVec<float> &phi) {vec_open} std::vector<ROOT::RVec<float>> variations(2 * evaluators.size(), pt); for (std::size_t g = 0; g < evaluators.size(); ++g) {vec_open} const bool hem = std::find(groups[g].begin(), groups[g].end(), "HEMIssue") != groups[g].end(); for (std::size_t i = 0; i < pt.size(); ++i) {vec_open} double unc2 = 0.0; for (const auto &evaluator : evaluators[g]) {vec_open} const double unc = evaluator->evaluate({vec_open}eta[i], pt[i]{vec_close}); unc2 += unc * unc; {vec_close} variations[2 * g][i] = pt[i] * (1.0 + std::sqrt(unc2)); variations[2 * g + 1][i] = pt[i] * (1.0 - std::sqrt(unc2)); if (hem && pt[i] > 15.0 && phi[i] > -1.57 && phi[i] < -0.87) {vec_open} if (eta[i] > -2.5 && eta[i] < -1.3) variations[2 * g + 1][i] *= 0.8; else if (eta[i] > -3.0 && eta[i] <= -2.5) variations[2 * g + 1][i] *= 0.65; {vec_close} {vec_close} {vec_close} return variations; {vec_close}, {input_vec})',
+    input=[q.Jet_pt_corrected_nominal, nanoAOD.Jet_eta, nanoAOD.Jet_phi],
+    output=[q.Jet_pt_corrected_jes_variations],
+    scopes=["global"],
+)
+JetPtCorrection_fromJesVariations = Producer(
+    name="JetPtCorrection_fromJesVariations",
+    call="{df}.Define({output}, [](const ROOT::RVec<float> &pt, const std::vector<ROOT::RVec<float>> &variations) {vec_open} return {jet_jes_variation} < 0 ? pt : variations[{jet_jes_variation}]; {vec_close}, {input_vec})",
+    input=[q.Jet_pt_corrected_nominal, q.Jet_pt_corrected_jes_variations],
+    output=[q.Jet_pt_corrected],
+    scopes=["global"],
+)
+JetEnergyCorrection_fromJesVariations = ProducerGroup(
+    name="JetEnergyCorrection_fromJesVariations",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["global"],
+    subproducers=[JetPtCorrection_fromJesVariations, JetMassCorrection],
+)
+JetEnergyCorrection_batchedJes = ProducerGroup(
+    name="JetEnergyCorrection_batchedJes",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["global"],
+    subproducers=[
+        JetPtCorrection_jesNominal,
+        JetPtCorrection_jesVariations,
+        JetPtCorrection_fromJesVariations,
+        JetMassCorrection,
+    ],
+)
 JetEnergyCorrection_data = ProducerGroup(
     name="JetEnergyCorrection",
     call=None,
@@ -86,6 +144,30 @@ JetEnergyCorrection_data = ProducerGroup(
     scopes=["global"],
     subproducers=[JetPtCorrection_data, JetMassCorrection],
 )
+# selects the JES tag of every data event from its run number, the tags and
+# the first runs of their run periods are given in ascending order
+JetPtCorrection_data_runDependent = Producer(
+    name="JetPtCorrection_data_runDependent",
+    call='{df}.Define({output}, [first_runs = std::vector<unsigned int>{vec_open}{jet_jes_first_runs_data}{vec_close}, evaluators = [](const std::string &file, const std::vector<std::string> &tags, const std::string &algo) {vec_open} auto cset = correction::CorrectionSet::from_file(file); std::vector<correction::CompoundCorrection::Ref> refs; for (const auto &tag : tags) refs.push_back(cset->compound().at(tag + "_L1L2L3Res_" + algo)); return refs; {vec_close}({jet_jec_file}, {vec_open}{jet_jes_tags_data}{vec_close}, {jet_jec_algo})](const unsigned int run, const ROOT::RVec<float> &pt, const ROOT::RVec<float> &eta, const ROOT::RVec<float> &area, const ROOT::RVec<float> &raw_factor, const float rho) {vec_open} const long period = std::upper_bound(first_runs.begin(), first_runs.end(), run) - first_runs.begin(); const auto &evaluator = evaluators[period > 0 ? period - 1 : 0]; ROOT::RVec<float> corrected_pt(pt.size()); for (std::size_t i = 0; i < pt.size(); ++i) {vec_open} const float raw_pt = pt[i] * (1 - raw_factor[i]); corrected_pt[i] = raw_pt * evaluator->evaluate({vec_open}area[i], eta[i], raw_pt, rho{vec_close}); {vec_close} return corrected_pt; {vec_close}, {input_vec})',
+    input=[
+        nanoAOD.run,
+        nanoAOD.Jet_pt,
+        nanoAOD.Jet_eta,
+        nanoAOD.Jet_area,
+        nanoAOD.Jet_rawFactor,
+        nanoAOD.rho,
+    ],
+    output=[q.Jet_pt_corrected],
+    scopes=["global"],
+)
+JetEnergyCorrection_data_runDependent = ProducerGroup(
+    name="JetEnergyCorrection_runDependent",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["global"],
+    subproducers=[JetPtCorrection_data_runDependent, JetMassCorrection],
+)
 JetPtCut = Producer(
     name="JetPtCut",
     call="physicsobject::CutPt({df}, {input}, {output}, {min_jet_pt})",
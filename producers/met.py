@@ -258,6 +258,43 @@ MetCorrections = ProducerGroup(
         MetPhi,
     ],
 )
+# recoil corrected MET followed by its variations metRecoilResponseUp,
+# metRecoilResponseDown, metRecoilResolutionUp and metRecoilResolutionDown,
+# evaluated with a single RecoilCorrector and MEtSys like in
+# met::applyRecoilCorrections, see recoil_variations.recoil_shifts_as_columns
+ApplyRecoilCorrections_variations = Producer(
+    name="ApplyRecoilCorrections_variations",
+    call='{df}.Define({output}, [corrector = {applyRecoilCorrections} ? std::make_shared<RecoilCorrector>("{recoil_corrections_file}") : nullptr, systematics = {applyRecoilCorrections} ? std::make_shared<MEtSys>("{recoil_systematics_file}") : nullptr](const ROOT::Math::PtEtaPhiMVector &met, const std::vector<float> &genboson, const ROOT::RVec<float> &jet_pt) {vec_open} std::vector<ROOT::Math::PtEtaPhiMVector> corrected(5, met); if (!corrector) return corrected; const int njets = ROOT::VecOps::Sum(jet_pt > 30) + ({is_wjets} ? 1 : 0); float x = 0.; float y = 0.; corrector->CorrectWithHist(met.Px(), met.Py(), genboson[0], genboson[1], genboson[2], genboson[3], njets, x, y); corrected[0].SetPxPyPzE(x, y, 0., std::sqrt(x * x + y * y)); const std::vector<std::pair<MEtSys::SysType, MEtSys::SysShift>> variations{vec_open}{vec_open}MEtSys::SysType::Response, MEtSys::SysShift::Up{vec_close}, {vec_open}MEtSys::SysType::Response, MEtSys::SysShift::Down{vec_close}, {vec_open}MEtSys::SysType::Resolution, MEtSys::SysShift::Up{vec_close}, {vec_open}MEtSys::SysType::Resolution, MEtSys::SysShift::Down{vec_close}{vec_close}; for (std::size_t i = 0; i < variations.size(); ++i) {vec_open} float shifted_x = 0.; float shifted_y = 0.; systematics->ApplyMEtSys(x, y, genboson[0], genboson[1], genboson[2], genboson[3], njets, variations[i].first, variations[i].second, shifted_x, shifted_y); corrected[i + 1].SetPxPyPzE(shifted_x, shifted_y, 0., std::sqrt(shifted_x * shifted_x + shifted_y * shifted_y)); {vec_close} return corrected; {vec_close}, {input_vec})',
+    input=[
+        q.met_p4_jetcorrected,
+        q.recoil_genboson_p4_vec,
+        q.Jet_pt_corrected,
+    ],
+    output=[q.met_p4_recoilcorrected_variations],
+    scopes=["et", "mt", "tt", "em", "mm", "ee"],
+)
+ApplyRecoilCorrections_fromVariations = Producer(
+    name="ApplyRecoilCorrections_fromVariations",
+    call="{df}.Define({output}, [](const std::vector<ROOT::Math::PtEtaPhiMVector> &met) {vec_open} return met[0]; {vec_close}, {input_vec})",
+    input=[q.met_p4_recoilcorrected_variations],
+    output=[q.met_p4_recoilcorrected],
+    scopes=["et", "mt", "tt", "em", "mm", "ee"],
+)
+MetCorrections_recoilVariations = ProducerGroup(
+    name="MetCorrections_recoilVariations",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["et", "mt", "tt", "em", "mm", "ee"],
+    subproducers=[
+        PropagateLeptonsToMet,
+        PropagateJetsToMet,
+        ApplyRecoilCorrections_variations,
+        ApplyRecoilCorrections_fromVariations,
+        MetPt,
+        MetPhi,
+    ],
+)
 PFMetCorrections = ProducerGroup(
     name="PFMetCorrections",
     call=None,
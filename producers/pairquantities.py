@@ -1,6 +1,10 @@
+import re
+from typing import List
+
 from ..quantities import output as q
 from ..quantities import nanoAOD as nanoAOD
 from code_generation.producer import Producer, ProducerGroup, ExtendedVectorProducer
+from code_generation.quantity import Quantity
 
 
 ####################
@@ -862,6 +866,370 @@ p4_fastmtt_em = Producer(
     output=[q.p4_fastmtt],
     scopes=["em"],
 )
+# inputs of the FastMTT producers
+fastmtt_inputs = [
+    q.pt_1,
+    q.pt_2,
+    q.eta_1,
+    q.eta_2,
+    q.phi_1,
+    q.phi_2,
+    q.mass_1,
+    q.mass_2,
+    q.met,
+    q.metphi,
+    q.metcov00,
+    q.metcov01,
+    q.metcov11,
+    q.tau_decaymode_1,
+    q.tau_decaymode_2,
+]
+# decay types of the two legs of the FastMTT fit in the channels
+fastmtt_legs = {
+    "mt": ("kTauToMuDecay", "kTauToHadDecay"),
+    "et": ("kTauToElecDecay", "kTauToHadDecay"),
+    "tt": ("kTauToHadDecay", "kTauToHadDecay"),
+    "em": ("kTauToElecDecay", "kTauToMuDecay"),
+}
+
+
+def fastmtt_arguments(suffix: str = "") -> str:
+    """
+    C++ lambda arguments of the FastMTT inputs, named like the quantities of
+    fastmtt_inputs followed by suffix.
+    """
+    return ", ".join(
+        f"const {'int' if 'decaymode' in quantity.name else 'float'} "
+        + f"{quantity.name}{suffix}"
+        for quantity in fastmtt_inputs
+    )
+
+
+def _fastmtt_leptons(channel: str) -> str:
+    # C++ statements of the legs and the MET covariance of the FastMTT fit
+    leptons = ", ".join(
+        f"classic_svFit::MeasuredTauLepton(classic_svFit::MeasuredTauLepton::{leg}, "
+        + f"pt_{i}, eta_{i}, phi_{i}, mass_{i}"
+        + (f", tau_decaymode_{i})" if leg == "kTauToHadDecay" else ")")
+        for i, leg in enumerate(fastmtt_legs[channel], start=1)
+    )
+    return (
+        "std::vector<classic_svFit::MeasuredTauLepton> leptons{vec_open}"
+        + leptons
+        + "{vec_close}; TMatrixD covMET(2, 2); covMET[0][0] = metcov00; "
+        + "covMET[1][0] = metcov01; covMET[0][1] = metcov01; covMET[1][1] = metcov11;"
+    )
+
+
+def fastmtt_fit(channel: str, result: str) -> str:
+    """
+    C++ statements of the FastMTT fit of a channel like in
+    quantities::p4_fastmtt, which store the p4 of the fit in the
+    PtEtaPhiMVector result. The inputs are read from the arguments given by
+    fastmtt_arguments.
+    """
+    return (
+        _fastmtt_leptons(channel)
+        + " FastMTT algo; algo.run(leptons, met * std::cos(metphi), "
+        + "met * std::sin(metphi), covMET); const auto best = algo.getBestP4(); "
+        + f"const ROOT::Math::PtEtaPhiMVector {result}(best.Pt(), best.Eta(), "
+        + "best.Phi(), best.M());"
+    )
+
+
+def fastmtt_scan(channel: str, result: str) -> str:
+    """
+    C++ statements of the FastMTT fit of a channel with a configurable
+    likelihood scan, see fastmtt_precision.py, which store the p4 of the fit
+    in the PtEtaPhiMVector result. Like FastMTT, the likelihood is scanned on
+    a grid of the energy fractions of the visible decay products, with the
+    likelihood components of FastMTT and fastmtt_grid_points points per
+    dimension. The grid is then refined up to
+    fastmtt_refinements times around the maximum, with the step of the
+    previous grid as half width, until the mass changes by less than
+    fastmtt_adaptive_tolerance relative to the previous step.
+    """
+    return (
+        _fastmtt_leptons(channel)
+        + " const auto leg = [&leptons](const std::size_t i) {vec_open} return "
+        + "ROOT::Math::PxPyPzEVector(leptons[i].px(), leptons[i].py(), "
+        + "leptons[i].pz(), leptons[i].energy()); {vec_close}; const "
+        + "ROOT::Math::PxPyPzEVector leg1 = leg(0), leg2 = leg(1); const double "
+        + "metx = met * std::cos(metphi), mety = met * std::sin(metphi); Likelihood "
+        + "likelihood; likelihood.enableComponent(fastMTT::MASS); "
+        + "likelihood.enableComponent(fastMTT::PX); "
+        + "likelihood.enableComponent(fastMTT::PY); "
+        + "likelihood.setLeptonInputs(leg1, leg2, leptons[0].type(), "
+        + "leptons[1].type(), leptons[0].decayMode(), leptons[1].decayMode()); "
+        + "likelihood.setMETInputs(ROOT::Math::PxPyPzEVector(metx, mety, 0., "
+        + "std::sqrt(metx * metx + mety * mety)), covMET); double best[2] = "
+        + "{vec_open}0.75, 0.75{vec_close}, center[2] = {vec_open}0.5, 0.5{vec_close}; "
+        + "double width = 0.5, best_value = 0., mass = -1.; for (int refinement = 0; "
+        + "refinement <= {fastmtt_refinements}; ++refinement) {vec_open} const int "
+        + "points = {fastmtt_grid_points}; const double step = 2. * width / points; "
+        + "for (int i2 = 1; i2 < points; ++i2) for (int i1 = 1; i1 < points; ++i1) "
+        + "{vec_open} const double x[2] = {vec_open}center[0] - width + i1 * step, "
+        + "center[1] - width + i2 * step{vec_close}; if (x[0] <= 0. || x[0] > 1. || "
+        + "x[1] <= 0. || x[1] > 1.) continue; const double value = "
+        + "likelihood.value(x); if (value < best_value) {vec_open} best_value = "
+        + "value; best[0] = x[0]; best[1] = x[1]; {vec_close} {vec_close} const "
+        + "double previous = mass; mass = (leg1 * (1. / best[0]) + leg2 * (1. / "
+        + "best[1])).M(); if (refinement > 0 && std::abs(mass - previous) < "
+        + "{fastmtt_adaptive_tolerance} * previous) break; center[0] = best[0]; "
+        + "center[1] = best[1]; width = step; {vec_close} const auto best_p4 = leg1 "
+        + "* (1. / best[0]) + leg2 * (1. / best[1]); "
+        + f"const ROOT::Math::PtEtaPhiMVector {result}(best_p4.Pt(), best_p4.Eta(), "
+        + "best_p4.Phi(), best_p4.M());"
+    )
+
+
+def fastmtt_cache_seed(channel: str) -> int:
+    """
+    64 bit FNV-1a hash of the channel name, the start of the keys of the
+    events of a channel, see fastmtt_cache.cache_keys.
+    """
+    seed = 0xCBF29CE484222325
+    for byte in channel.encode():
+        seed = ((seed ^ byte) * 0x100000001B3) % 2**64
+    return seed
+
+
+def fastmtt_cached_producer(channel: str) -> Producer:
+    """
+    FastMTT producer of a channel with a persistent cache. The sorted cache
+    fastmtt_cache_file is memory-mapped once per producer and the key of an
+    event is looked up with a binary search, like in fastmtt_cache.lookup.
+    The results of the events that are not in the cache are appended as
+    records of fastmtt_cache.py to a new file starting with
+    fastmtt_cache_entries_prefix, which is unique for every producer and
+    process. The file is written through the buffer of the stream, which is
+    flushed when the producer is destroyed at the end of the event loop.
+    """
+    load = (
+        "cache = [] {vec_open} struct Mapping {vec_open} const unsigned char "
+        + "*data = nullptr; std::size_t size = 0; ~Mapping() {vec_open} if (data) "
+        + "munmap(const_cast<unsigned char *>(data), size); {vec_close} "
+        + "{vec_close}; auto mapping = std::make_shared<Mapping>(); const int fd = "
+        + 'open("{fastmtt_cache_file}", O_RDONLY); if (fd >= 0) {vec_open} struct '
+        + "stat info; if (fstat(fd, &info) == 0 && info.st_size > 0) {vec_open} "
+        + "void *data = mmap(nullptr, info.st_size, PROT_READ, MAP_PRIVATE, fd, 0); "
+        + "if (data != MAP_FAILED) {vec_open} mapping->data = static_cast<const "
+        + "unsigned char *>(data); mapping->size = info.st_size; {vec_close} "
+        + "{vec_close} close(fd); {vec_close} return std::shared_ptr<const Mapping>("
+        + "mapping); {vec_close}()"
+    )
+    writer = (
+        "writer = std::make_shared<std::pair<std::mutex, std::ofstream>>()"
+    )
+    key = (
+        f"std::uint64_t key = {fastmtt_cache_seed(channel)}ULL; "
+        + "const auto hash = [&key](const auto value) {vec_open} const auto *bytes "
+        + "= reinterpret_cast<const unsigned char *>(&value); for (std::size_t i = "
+        + "0; i < sizeof(value); ++i) key = (key ^ bytes[i]) * 0x100000001B3ULL; "
+        + "{vec_close}; "
+        + " ".join(
+            f"hash(static_cast<std::int32_t>({quantity.name}));"
+            if "decaymode" in quantity.name
+            else f"hash({quantity.name});"
+            for quantity in fastmtt_inputs
+        )
+    )
+    # records of a 64 bit key followed by pt, eta, phi and mass as floats
+    search = (
+        "const std::size_t records = cache->size / 24; std::size_t low = 0, high = "
+        + "records; const auto key_at = [&cache](const std::size_t index) "
+        + "{vec_open} std::uint64_t value; std::memcpy(&value, cache->data + 24 * "
+        + "index, sizeof(value)); return value; {vec_close}; while (low < high) "
+        + "{vec_open} const std::size_t middle = low + (high - low) / 2; if "
+        + "(key_at(middle) < key) low = middle + 1; else high = middle; {vec_close} "
+        + "if (low < records && key_at(low) == key) {vec_open} float cached[4]; "
+        + "std::memcpy(cached, cache->data + 24 * low + 8, sizeof(cached)); return "
+        + "ROOT::Math::PtEtaPhiMVector(cached[0], cached[1], cached[2], cached[3]); "
+        + "{vec_close}"
+    )
+    write = (
+        "std::array<float, 4> record{vec_open}static_cast<float>(p4.Pt()), "
+        + "static_cast<float>(p4.Eta()), static_cast<float>(p4.Phi()), "
+        + "static_cast<float>(p4.M()){vec_close}; {vec_open} const std::lock_guard"
+        + "<std::mutex> lock(writer->first); if (!writer->second.is_open()) "
+        + 'writer->second.open("{fastmtt_cache_entries_prefix}" + std::to_string('
+        + "std::chrono::system_clock::now().time_since_epoch().count()) + \"_\" + "
+        + "std::to_string(reinterpret_cast<std::uintptr_t>(writer.get())), "
+        + "std::ios::binary); writer->second.write(reinterpret_cast<const char *>"
+        + "(&key), sizeof(key)); writer->second.write(reinterpret_cast<const char *>"
+        + "(record.data()), sizeof(record)); {vec_close}"
+    )
+    return Producer(
+        name=f"p4_fastmtt_cached_{channel}",
+        call=f"{{df}}.Define({{output}}, [{load}, {writer}]({fastmtt_arguments()}) "
+        + "{vec_open} "
+        + key
+        + " "
+        + search
+        + " "
+        + fastmtt_fit(channel, "p4")
+        + " "
+        + write
+        + " return ROOT::Math::PtEtaPhiMVector(record[0], record[1], record[2], "
+        + "record[3]); {vec_close}, {input_vec})",
+        input=list(fastmtt_inputs),
+        output=[q.p4_fastmtt],
+        scopes=[channel],
+    )
+
+
+# FastMTT with a persistent cache, see fastmtt_cache.py for the format of the
+# cache and the key of an event. Only events that are not found in
+# fastmtt_cache_file are evaluated, their results are written to a new file
+# starting with fastmtt_cache_entries_prefix, which is merged into the cache
+# with scripts/merge_fastmtt_cache.py. Cached and new results are both
+# returned with the single precision of the cache.
+p4_fastmtt_cached_mt = fastmtt_cached_producer("mt")
+p4_fastmtt_cached_et = fastmtt_cached_producer("et")
+p4_fastmtt_cached_tt = fastmtt_cached_producer("tt")
+p4_fastmtt_cached_em = fastmtt_cached_producer("em")
+# FastMTT reusing the nominal result in the shifted branches. The nominal
+# result is evaluated once from copies of the inputs that are never shifted.
+# In a shifted branch, the mass fit is only repeated for events whose inputs
+# differ from the nominal ones, all other events take the nominal result.
+fastmtt_nominal_inputs = [Quantity(quantity.name) for quantity in fastmtt_inputs]
+p4_fastmtt_nominal_mt = Producer(
+    name="p4_fastmtt_nominal_mt",
+    call='quantities::p4_fastmtt({df}, {output}, {input}, "mt")',
+    input=list(fastmtt_nominal_inputs),
+    output=[q.p4_fastmtt_nominal],
+    scopes=["mt"],
+)
+p4_fastmtt_nominal_et = Producer(
+    name="p4_fastmtt_nominal_et",
+    call='quantities::p4_fastmtt({df}, {output}, {input}, "et")',
+    input=list(fastmtt_nominal_inputs),
+    output=[q.p4_fastmtt_nominal],
+    scopes=["et"],
+)
+p4_fastmtt_nominal_tt = Producer(
+    name="p4_fastmtt_nominal_tt",
+    call='quantities::p4_fastmtt({df}, {output}, {input}, "tt")',
+    input=list(fastmtt_nominal_inputs),
+    output=[q.p4_fastmtt_nominal],
+    scopes=["tt"],
+)
+p4_fastmtt_nominal_em = Producer(
+    name="p4_fastmtt_nominal_em",
+    call='quantities::p4_fastmtt({df}, {output}, {input}, "em")',
+    input=list(fastmtt_nominal_inputs),
+    output=[q.p4_fastmtt_nominal],
+    scopes=["em"],
+)
+
+
+def fastmtt_reuse_producer(channel: str) -> Producer:
+    """
+    FastMTT producer of a channel, which returns the nominal result if all
+    inputs are equal to the nominal ones and repeats the fit otherwise.
+    """
+    unchanged = " && ".join(
+        f"{quantity.name} == {quantity.name}_nominal" for quantity in fastmtt_inputs
+    )
+    return Producer(
+        name=f"p4_fastmtt_reuse_{channel}",
+        call=f"{{df}}.Define({{output}}, []({fastmtt_arguments()}, "
+        + f"{fastmtt_arguments('_nominal')}, "
+        + "const ROOT::Math::PtEtaPhiMVector &p4_nominal) {vec_open} "
+        + f"if ({unchanged}) return p4_nominal; "
+        + fastmtt_fit(channel, "p4")
+        + " return p4; {vec_close}, {input_vec})",
+        input=fastmtt_inputs + fastmtt_nominal_inputs + [q.p4_fastmtt_nominal],
+        output=[q.p4_fastmtt],
+        scopes=[channel],
+    )
+
+
+p4_fastmtt_reuse_mt = fastmtt_reuse_producer("mt")
+p4_fastmtt_reuse_et = fastmtt_reuse_producer("et")
+p4_fastmtt_reuse_tt = fastmtt_reuse_producer("tt")
+p4_fastmtt_reuse_em = fastmtt_reuse_producer("em")
+
+# FastMTT only for events passing the preselection fastmtt_preselection, a C++
+# expression of the quantities in fastmtt_preselection_inputs, e.g.
+# "q_1 * q_2 < 0 && mt_1 < 70". All other events get the default value. The
+# preselection is evaluated with the shifted quantities in the shifted
+# branches, so only the events passing it there are fitted.
+fastmtt_preselection_inputs = [
+    q.pt_1,
+    q.pt_2,
+    q.eta_1,
+    q.eta_2,
+    q.phi_1,
+    q.phi_2,
+    q.mass_1,
+    q.mass_2,
+    q.q_1,
+    q.q_2,
+    q.iso_1,
+    q.iso_2,
+    q.tau_decaymode_1,
+    q.tau_decaymode_2,
+    q.m_vis,
+    q.pt_vis,
+    q.deltaR_ditaupair,
+    q.met,
+    q.mt_1,
+    q.mt_2,
+]
+
+
+def fastmtt_preselection_columns(expression: str) -> List[str]:
+    """
+    Names of the columns used in a C++ expression, i.e. all identifiers that
+    are not followed by a call or a scope, e.g. std::abs, or are part of one.
+    """
+    return sorted(
+        set(re.findall(r"(?<![\w.:])([A-Za-z_]\w*)\b(?!\s*(?:\(|::))", expression))
+        - {"true", "false"}
+    )
+
+
+# the expression is evaluated as string Define, in which the names of the
+# inputs are replaced by the columns of the inputs in the branch
+fastmtt_preselection_flag = Producer(
+    name="fastmtt_preselection_flag",
+    call="{df}.Define({output}, [](std::string expression, const "
+    + "std::vector<std::string> &columns) {vec_open} const std::vector<std::string> "
+    + "names{vec_open}"
+    + ", ".join(f'"{quantity.name}"' for quantity in fastmtt_preselection_inputs)
+    + '{vec_close}; for (std::size_t i = 0; i < names.size(); ++i) expression = '
+    + 'std::regex_replace(expression, std::regex("\\\\b" + names[i] + "\\\\b"), '
+    + 'columns[i]); return "static_cast<bool>(" + expression + ")"; {vec_close}('
+    + '"{fastmtt_preselection}", {input_vec}))',
+    input=list(fastmtt_preselection_inputs),
+    output=[q.fastmtt_preselection],
+    scopes=["mt", "et", "tt", "em"],
+)
+
+
+def fastmtt_preselected_producer(channel: str) -> Producer:
+    """
+    FastMTT producer of a channel, which only evaluates the fit for events
+    passing the preselection.
+    """
+    return Producer(
+        name=f"p4_fastmtt_preselected_{channel}",
+        call=f"{{df}}.Define({{output}}, []({fastmtt_arguments()}, const bool pass) "
+        + "{vec_open} if (!pass) return ROOT::Math::PtEtaPhiMVector(-10., -10., "
+        + "-10., -10.); "
+        + fastmtt_fit(channel, "p4")
+        + " return p4; {vec_close}, {input_vec})",
+        input=fastmtt_inputs + [q.fastmtt_preselection],
+        output=[q.p4_fastmtt],
+        scopes=[channel],
+    )
+
+
+p4_fastmtt_preselected_mt = fastmtt_preselected_producer("mt")
+p4_fastmtt_preselected_et = fastmtt_preselected_producer("et")
+p4_fastmtt_preselected_tt = fastmtt_preselected_producer("tt")
+p4_fastmtt_preselected_em = fastmtt_preselected_producer("em")
 pt_fastmtt = Producer(
     name="pt_fastmtt",
     call="quantities::pt({df}, {output}, {input})",
@@ -903,3 +1271,98 @@ FastMTTQuantities = ProducerGroup(
         "em": [p4_fastmtt_em, pt_fastmtt, eta_fastmtt, phi_fastmtt, m_fastmtt],
     },
 )
+FastMTTQuantities_cached = ProducerGroup(
+    name="FastMTTQuantities_cached",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["mt", "et", "tt", "em"],
+    subproducers={
+        "mt": [p4_fastmtt_cached_mt, pt_fastmtt, eta_fastmtt, phi_fastmtt, m_fastmtt],
+        "et": [p4_fastmtt_cached_et, pt_fastmtt, eta_fastmtt, phi_fastmtt, m_fastmtt],
+        "tt": [p4_fastmtt_cached_tt, pt_fastmtt, eta_fastmtt, phi_fastmtt, m_fastmtt],
+        "em": [p4_fastmtt_cached_em, pt_fastmtt, eta_fastmtt, phi_fastmtt, m_fastmtt],
+    },
+)
+FastMTTQuantities_reuseNominal = ProducerGroup(
+    name="FastMTTQuantities_reuseNominal",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["mt", "et", "tt", "em"],
+    subproducers={
+        "mt": [
+            p4_fastmtt_nominal_mt,
+            p4_fastmtt_reuse_mt,
+            pt_fastmtt,
+            eta_fastmtt,
+            phi_fastmtt,
+            m_fastmtt,
+        ],
+        "et": [
+            p4_fastmtt_nominal_et,
+            p4_fastmtt_reuse_et,
+            pt_fastmtt,
+            eta_fastmtt,
+            phi_fastmtt,
+            m_fastmtt,
+        ],
+        "tt": [
+            p4_fastmtt_nominal_tt,
+            p4_fastmtt_reuse_tt,
+            pt_fastmtt,
+            eta_fastmtt,
+            phi_fastmtt,
+            m_fastmtt,
+        ],
+        "em": [
+            p4_fastmtt_nominal_em,
+            p4_fastmtt_reuse_em,
+            pt_fastmtt,
+            eta_fastmtt,
+            phi_fastmtt,
+            m_fastmtt,
+        ],
+    },
+)
+FastMTTQuantities_preselected = ProducerGroup(
+    name="FastMTTQuantities_preselected",
+    call=None,
+    input=None,
+    output=None,
+    scopes=["mt", "et", "tt", "em"],
+    subproducers={
+        "mt": [
+            fastmtt_preselection_flag,
+            p4_fastmtt_preselected_mt,
+            pt_fastmtt,
+            eta_fastmtt,
+            phi_fastmtt,
+            m_fastmtt,
+        ],
+        "et": [
+            fastmtt_preselection_flag,
+            p4_fastmtt_preselected_et,
+            pt_fastmtt,
+            eta_fastmtt,
+            phi_fastmtt,
+            m_fastmtt,
+        ],
+        "tt": [
+            fastmtt_preselection_flag,
+            p4_fastmtt_preselected_tt,
+            pt_fastmtt,
+            eta_fastmtt,
+            phi_fastmtt,
+            m_fastmtt,
+        ],
+        "em": [
+            fastmtt_preselection_flag,
+            p4_fastmtt_preselected_em,
+            pt_fastmtt,
+            eta_fastmtt,
+            phi_fastmtt,
+            m_fastmtt,
+        ],
+    },
+)
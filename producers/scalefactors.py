@@ -356,3 +356,22 @@ btagging_SF = Producer(
     output=[q.btag_weight],
     scopes=["tt", "mt", "et", "mm", "em", "ee"],
 )
+# evaluates the btag weights of the shape variations given in
+# btag_sf_variations in a single loop over the jets, the jets are selected
+# and the cferr variations are applied to c jets only, like in btagSF. The
+# central weight, which is varied by the JES shifts, is given by btagging_SF.
+btagging_SF_variations = Producer(
+    name="btagging_SF_variations",
+    call='{df}.Define({output}, [evaluator = correction::CorrectionSet::from_file("{btag_sf_file}")->at("{btag_corr_algo}"), variations = std::vector<std::string>{vec_open}{btag_sf_variations}{vec_close}](const ROOT::RVec<float> &pt, const ROOT::RVec<float> &eta, const ROOT::RVec<float> &btag, const ROOT::RVec<int> &flavor, const ROOT::RVec<int> &jet_mask, const ROOT::RVec<int> &bjet_mask, const ROOT::RVec<int> &jet_veto_mask) {vec_open} ROOT::RVec<float> weights(variations.size(), 1.0); for (std::size_t i = 0; i < pt.size(); ++i) {vec_open} if (!((jet_mask[i] || bjet_mask[i]) && jet_veto_mask[i]) || std::abs(eta[i]) >= 2.5 || pt[i] < 20.0) continue; const double central = evaluator->evaluate({vec_open}std::string("central"), flavor[i], std::abs(eta[i]), pt[i], btag[i]{vec_close}); for (std::size_t v = 0; v < variations.size(); ++v) {vec_open} const bool cferr = variations[v].find("cferr") != std::string::npos; weights[v] *= cferr == (flavor[i] == 4) ? evaluator->evaluate({vec_open}variations[v], flavor[i], std::abs(eta[i]), pt[i], btag[i]{vec_close}) : central; {vec_close} {vec_close} return weights; {vec_close}, {input_vec})',
+    input=[
+        q.Jet_pt_corrected,
+        nanoAOD.Jet_eta,
+        nanoAOD.BJet_discriminator,
+        nanoAOD.Jet_flavor,
+        q.good_jets_mask,
+        q.good_bjets_mask,
+        q.jet_overlap_veto_mask,
+    ],
+    output=[q.btag_weight_variations],
+    scopes=["tt", "mt", "et"],
+)
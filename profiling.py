@@ -0,0 +1,82 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import json
+import os
+import resource
+import time
+import tracemalloc
+from typing import Dict, List, Union
+
+
+class ConfigProfiler:
+    """
+    Records the wall time and the peak memory of consecutive phases of a
+    configuration build. A phase starts at the previous checkpoint (or at
+    start()) and ends at the checkpoint with its name. The peak memory is the
+    peak of the python allocations traced during the phase, relative to the
+    memory in use when the phase started.
+
+    A disabled profiler ignores all calls, so build functions can call it
+    unconditionally.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.phases: List[Dict[str, Union[str, float, int]]] = []
+        self._started_tracing = False
+        self._phase_start = 0.0
+        self._phase_memory = 0
+
+    def start(self):
+        if not self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._begin_phase()
+
+    def _begin_phase(self):
+        tracemalloc.reset_peak()
+        self._phase_memory = tracemalloc.get_traced_memory()[0]
+        self._phase_start = time.perf_counter()
+
+    def checkpoint(self, name: str):
+        if not self.enabled:
+            return
+        wall_time = time.perf_counter() - self._phase_start
+        peak_memory = tracemalloc.get_traced_memory()[1] - self._phase_memory
+        self.phases.append(
+            {
+                "phase": name,
+                "wall_time": wall_time,
+                "peak_memory": peak_memory,
+            }
+        )
+        self._begin_phase()
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self, **metadata) -> dict:
+        return {
+            **metadata,
+            "phases": self.phases,
+            "total_wall_time": sum(phase["wall_time"] for phase in self.phases),
+            "max_peak_memory": max(
+                [phase["peak_memory"] for phase in self.phases], default=0
+            ),
+            # resident set size of the whole process in kB, including the
+            # memory that is not allocated by python
+            "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    def write(self, filename: str, **metadata):
+        """
+        Write the recorded phases together with the given metadata as json.
+        """
+        self.stop()
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with open(filename, "w") as f:
+            json.dump(self.report(**metadata), f, indent=4)
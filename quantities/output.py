@@ -33,6 +33,8 @@ Tau_pt_corrected = Quantity("Tau_pt_corrected")
 Tau_mass_corrected = Quantity("Tau_mass_corrected")
 Jet_pt_corrected = Quantity("Jet_pt_corrected")
 Jet_mass_corrected = Quantity("Jet_mass_corrected")
+Jet_pt_corrected_nominal = Quantity("Jet_pt_corrected_nominal")
+Jet_pt_corrected_jes_variations = Quantity("Jet_pt_corrected_jes_variations")
 dileptonpair = Quantity("dileptonpair")
 gen_dileptonpair = Quantity("gen_dileptonpair")
 truegenpair = Quantity("truegenpair")
@@ -92,6 +94,8 @@ muon_pterr_2 = Quantity("muon_pterr_2")
 # Combined event quantities
 m_vis = Quantity("m_vis")
 p4_fastmtt = Quantity("p4_fastmtt")
+p4_fastmtt_nominal = Quantity("p4_fastmtt_nominal")
+fastmtt_preselection = Quantity("fastmtt_preselection")
 m_fastmtt = Quantity("m_fastmtt")
 pt_fastmtt = Quantity("pt_fastmtt")
 eta_fastmtt = Quantity("eta_fastmtt")
@@ -195,6 +199,7 @@ npartons = Quantity("npartons")
 met_p4_leptoncorrected = Quantity("met_p4_leptoncorrected")
 met_p4_jetcorrected = Quantity("met_p4_jetcorrected")
 met_p4_recoilcorrected = Quantity("met_p4_recoilcorrected")
+met_p4_recoilcorrected_variations = Quantity("met_p4_recoilcorrected_variations")
 met = Quantity("met")
 metphi = Quantity("metphi")
 metSumEt = Quantity("metSumEt")
@@ -231,6 +236,15 @@ emb_SelectionNewMass = Quantity("emb_SelectionNewMass")
 emb_triggersel_wgt = Quantity("emb_triggersel_wgt")
 emb_idsel_wgt_1 = Quantity("emb_idsel_wgt_1")
 emb_idsel_wgt_2 = Quantity("emb_idsel_wgt_2")
+# tau energy scale scan for the measurement, one entry per scale point
+tauES_scan_pt_2 = Quantity("tauES_scan_pt_2")
+tauES_scan_m_vis = Quantity("tauES_scan_m_vis")
+tauES_scan_tau_pt_flag = Quantity("tauES_scan_tau_pt_flag")
+# electron energy scale scan for the measurement, one entry per scale point
+eleES_scan_pt_1 = Quantity("eleES_scan_pt_1")
+eleES_scan_pt_2 = Quantity("eleES_scan_pt_2")
+eleES_scan_m_vis = Quantity("eleES_scan_m_vis")
+eleES_scan_electron_pt_flag = Quantity("eleES_scan_electron_pt_flag")
 
 
 # sample flags
@@ -267,3 +281,4 @@ iso_wgt_mu_1 = Quantity("iso_wgt_mu_1")
 iso_wgt_mu_2 = Quantity("iso_wgt_mu_2")
 # btag weight
 btag_weight = Quantity("btag_weight")
+btag_weight_variations = Quantity("btag_weight_variations")
@@ -0,0 +1,256 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+from typing import List, Set
+
+from code_generation.configuration import Configuration
+from code_generation.producer import Producer
+from code_generation.quantity import Quantity
+from code_generation.rules import AppendProducer, ReplaceProducer
+from code_generation.systematics import SystematicShift
+from .config_inspection import producer_inputs
+from .config_inspection import producers as configuration_producers
+from .producers import met as met
+from .producers import pairquantities as pairquantities
+from .quantities import output as q
+from .weight_variations import is_selected
+
+# evaluate the recoil corrected MET for all recoil shifts in the nominal event
+# loop and write the MET and the quantities in recoil_column_producers as
+# additional columns <quantity>__<shift>, instead of a shifted copy of the
+# dataframe per shift. The recoil corrections are loaded once and evaluated
+# for the nominal MET and all variations in met.MetCorrections_recoilVariations.
+# Written quantities that depend on the MET, but are not in
+# recoil_column_producers, would not be varied, so the configuration is
+# rejected if it contains any. The columns are only evaluated for the nominal
+# event, other shifts, e.g. of the jets, do not vary them.
+recoil_shifts_as_columns = False
+
+recoil_scopes = ("et", "mt", "tt", "em", "ee", "mm")
+
+# recoil shifts, given by the name of the shift and whether the resolution or
+# the response is varied up or down, in the order of the variations evaluated
+# by met.ApplyRecoilCorrections_variations
+recoil_variations = [
+    ("metRecoilResponseUp", "response", "up"),
+    ("metRecoilResponseDown", "response", "down"),
+    ("metRecoilResolutionUp", "resolution", "up"),
+    ("metRecoilResolutionDown", "resolution", "down"),
+]
+
+# producers evaluated for every recoil variation of the MET, in the order of
+# their dependencies. Only the producers that are part of the configuration
+# and depend on the MET are evaluated, e.g. only the configured FastMTT
+# producers of a channel.
+recoil_column_producers = [
+    met.MetPt,
+    met.MetPhi,
+    pairquantities.Pzetamissvis,
+    pairquantities.mTdileptonMET,
+    pairquantities.mt_1,
+    pairquantities.mt_2,
+    pairquantities.pt_tt,
+    pairquantities.pt_ttjj,
+    pairquantities.mt_tot,
+    pairquantities.p4_fastmtt_nominal_mt,
+    pairquantities.p4_fastmtt_nominal_et,
+    pairquantities.p4_fastmtt_nominal_tt,
+    pairquantities.p4_fastmtt_nominal_em,
+    pairquantities.fastmtt_preselection_flag,
+    pairquantities.p4_fastmtt_mt,
+    pairquantities.p4_fastmtt_et,
+    pairquantities.p4_fastmtt_tt,
+    pairquantities.p4_fastmtt_em,
+    pairquantities.p4_fastmtt_cached_mt,
+    pairquantities.p4_fastmtt_cached_et,
+    pairquantities.p4_fastmtt_cached_tt,
+    pairquantities.p4_fastmtt_cached_em,
+    pairquantities.p4_fastmtt_reuse_mt,
+    pairquantities.p4_fastmtt_reuse_et,
+    pairquantities.p4_fastmtt_reuse_tt,
+    pairquantities.p4_fastmtt_reuse_em,
+    pairquantities.p4_fastmtt_preselected_mt,
+    pairquantities.p4_fastmtt_preselected_et,
+    pairquantities.p4_fastmtt_preselected_tt,
+    pairquantities.p4_fastmtt_preselected_em,
+    pairquantities.pt_fastmtt,
+    pairquantities.eta_fastmtt,
+    pairquantities.phi_fastmtt,
+    pairquantities.m_fastmtt,
+]
+
+
+def recoil_met_producer(name: str, index: int, scope: str) -> Producer:
+    """
+    Producer of the recoil corrected MET of the recoil shift name, which is
+    the entry index of the variations of met.ApplyRecoilCorrections_variations.
+    The variations are read from a copy of their quantity, which is never
+    shifted.
+    """
+    return Producer(
+        name=f"ApplyRecoilCorrections__{name}",
+        call="{df}.Define({output}, [](const std::vector<ROOT::Math::PtEtaPhiMVector> "
+        + f"&met) {{vec_open}} return met[{index}]; {{vec_close}}, {{input_vec}})",
+        input=[Quantity(q.met_p4_recoilcorrected_variations.name)],
+        output=[Quantity(f"{q.met_p4_recoilcorrected.name}__{name}")],
+        scopes=[scope],
+    )
+
+
+def recoil_column_producer(
+    producer: Producer, name: str, scope: str, shifted: Set[str]
+) -> Producer:
+    """
+    Copy of a producer for the recoil shift name, which reads the inputs
+    listed in shifted as <input>__<name> and writes its outputs as
+    <output>__<name>. The outputs are added to shifted. Like in
+    recoil_met_producer, the other inputs are read from copies of their
+    quantities, which are never shifted, so that the shifts of the
+    configuration do not evaluate the copy again.
+    """
+    inputs = [
+        Quantity(f"{quantity.name}__{name}")
+        if quantity.name in shifted
+        else Quantity(quantity.name)
+        for quantity in producer_inputs(producer, scope)
+    ]
+    shifted.update(quantity.name for quantity in producer.output)
+    return Producer(
+        name=f"{producer.name}__{name}",
+        call=producer.call,
+        input=inputs,
+        output=[
+            Quantity(f"{quantity.name}__{name}") for quantity in producer.output
+        ],
+        scopes=[scope],
+    )
+
+
+def recoil_column_copies(
+    configuration: Configuration, name: str, scope: str
+) -> List[Producer]:
+    """
+    Copies of the producers in recoil_column_producers for the recoil shift
+    name, which are part of the scope of the configuration and depend on the
+    recoil corrected MET.
+    """
+    # by name, to find the copies of fastmtt_precision.add_fastmtt_precision
+    configured = {
+        producer.name: producer
+        for producer in configuration_producers(configuration).get(scope, [])
+    }
+    shifted = {q.met_p4_recoilcorrected.name}
+    copies = []
+    for producer in recoil_column_producers:
+        producer = configured.get(producer.name)
+        if producer is None or not any(
+            quantity.name in shifted for quantity in producer_inputs(producer, scope)
+        ):
+            continue
+        copies.append(recoil_column_producer(producer, name, scope, shifted))
+    return copies
+
+
+def unvaried_outputs(configuration: Configuration, scope: str) -> List[str]:
+    """
+    Names of the outputs of a scope that depend on the recoil corrected MET,
+    but are not evaluated for the recoil shifts by recoil_column_producers.
+    """
+    producers = configuration_producers(configuration).get(scope, [])
+    dependent = {q.met_p4_recoilcorrected.name}
+    changed = True
+    while changed:
+        changed = False
+        for producer in producers:
+            if not any(
+                quantity.name in dependent
+                for quantity in producer_inputs(producer, scope)
+            ):
+                continue
+            for quantity in producer.output or []:
+                if quantity.name not in dependent:
+                    dependent.add(quantity.name)
+                    changed = True
+    varied = set(
+        quantity.name
+        for producer in recoil_column_producers
+        for quantity in producer.output
+    )
+    written = set(
+        getattr(quantity, "name", None)
+        for quantity in configuration.outputs.get(scope, [])
+    )
+    return sorted((dependent & written) - varied)
+
+
+def add_recoilVariations(
+    configuration: Configuration, available_sample_types: List[str], shifts: Set[str]
+):
+    #########################
+    # MET Recoil Shifts
+    #########################
+    samples = [
+        sample
+        for sample in available_sample_types
+        if sample not in ["data", "embedding", "embedding_mc"]
+    ]
+    if not recoil_shifts_as_columns:
+        for name, systematic, direction in recoil_variations:
+            configuration.add_shift(
+                SystematicShift(
+                    name=name,
+                    shift_config={
+                        recoil_scopes: {
+                            "apply_recoil_resolution_systematic": systematic
+                            == "resolution",
+                            "apply_recoil_response_systematic": systematic
+                            == "response",
+                            "recoil_systematic_shift_up": direction == "up",
+                            "recoil_systematic_shift_down": direction == "down",
+                        }
+                    },
+                    producers={recoil_scopes: met.ApplyRecoilCorrections},
+                ),
+                samples=samples,
+            )
+        return
+    selected = [
+        (index, name)
+        for index, (name, _, _) in enumerate(recoil_variations, start=1)
+        if is_selected(name, shifts)
+    ]
+    if not selected or configuration.sample not in samples:
+        return
+    for scope in recoil_scopes:
+        unvaried = unvaried_outputs(configuration, scope)
+        if unvaried:
+            raise ValueError(
+                f"The outputs {', '.join(unvaried)} of the {scope} scope depend "
+                + "on the recoil corrected MET, but are not varied by the recoil "
+                + "shifts if recoil_shifts_as_columns is set. Add their "
+                + "producers to recoil_column_producers or use systematic shifts."
+            )
+        configuration.add_modification_rule(
+            scope,
+            ReplaceProducer(
+                producers=[met.MetCorrections, met.MetCorrections_recoilVariations],
+                samples=samples,
+                update_output=False,
+            ),
+        )
+        for index, name in selected:
+            configuration.add_modification_rule(
+                scope,
+                AppendProducer(
+                    producers=recoil_met_producer(name, index, scope),
+                    samples=samples,
+                    update_output=False,
+                ),
+            )
+            # the rule also adds the outputs for the selected samples
+            configuration.add_modification_rule(
+                scope,
+                AppendProducer(
+                    producers=recoil_column_copies(configuration, name, scope),
+                    samples=samples,
+                ),
+            )
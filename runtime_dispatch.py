@@ -0,0 +1,370 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import re
+from typing import Any, Dict, List, Set
+
+from code_generation.configuration import Configuration
+from .config_inspection import parameter_pattern, vector_parameters
+from .config_inspection import producers as configuration_producers
+from .config_inspection import scopes as configuration_scopes
+from .config_inspection import shifts as configuration_shifts
+
+# environment variables of the executable used to select the variant at runtime
+runtime_variables = {
+    "sample": "CROWN_SAMPLE",
+    "era": "CROWN_ERA",
+}
+
+
+def _quoted(call: str, position: int) -> bool:
+    # a parameter is part of a string literal, if an odd number of unescaped
+    # quotes precedes it
+    return len(re.findall(r'(?<!\\)"', call[:position])) % 2 == 1
+
+
+def parameter_usage(configuration: Configuration) -> Dict[str, Set[str]]:
+    """
+    Collect how the parameters are used in the producer calls of an expanded
+    configuration. For every parameter the set of contexts is returned,
+    "quoted" for parameters inside a string literal, "raw" for parameters that
+    are inserted as C++ code and "vector" for the parameters that configure
+    vector producers and therefore define the structure of the code.
+    """
+    usage: Dict[str, Set[str]] = {}
+    for scope_producers in configuration_producers(configuration).values():
+        for producer in scope_producers:
+            for parameter in vector_parameters(producer):
+                usage.setdefault(parameter, set()).add("vector")
+            if producer.call is None:
+                continue
+            for match in parameter_pattern.finditer(producer.call):
+                usage.setdefault(match.group(1), set()).add(
+                    "quoted" if _quoted(producer.call, match.start()) else "raw"
+                )
+    return usage
+
+
+def vector_calls(configuration: Configuration) -> Dict[str, List[str]]:
+    """
+    Calls of the vector producers of an expanded configuration, by the
+    parameters that configure them.
+    """
+    calls: Dict[str, List[str]] = {}
+    for scope_producers in configuration_producers(configuration).values():
+        for producer in scope_producers:
+            for parameter in vector_parameters(producer):
+                calls.setdefault(parameter, []).append(producer.call or "")
+    return calls
+
+
+def _call_contexts(calls: List[str], parameter: str) -> Set[str]:
+    # contexts of a parameter in a list of calls, see parameter_usage
+    return set(
+        "quoted" if _quoted(call, match.start()) else "raw"
+        for call in calls
+        for match in parameter_pattern.finditer(call)
+        if match.group(1) == parameter
+    )
+
+
+def _structure(configuration: Configuration) -> Dict[str, Any]:
+    # everything that defines the generated code apart from the parameters
+    producers = configuration_producers(configuration)
+    return {
+        "scopes": configuration_scopes(configuration),
+        "shifts": configuration_shifts(configuration),
+        "producers": {
+            scope: [
+                (
+                    producer.name,
+                    [
+                        (quantity.name, sorted(quantity.get_shifts(scope)))
+                        for quantity in producer.output or []
+                    ],
+                )
+                for producer in scope_producers
+            ]
+            for scope, scope_producers in producers.items()
+        },
+        "outputs": {
+            scope: sorted(quantity.name for quantity in outputs)
+            for scope, outputs in configuration.outputs.items()
+        },
+    }
+
+
+def _differences(reference: Any, other: Any) -> List[str]:
+    # human readable differences of two entries of _structure
+    if reference == other:
+        return []
+    if not isinstance(reference, dict):
+        return [f"{other} instead of {reference}"]
+    differences = []
+    for scope in sorted(set(reference) | set(other)):
+        first, second = reference.get(scope, []), other.get(scope, [])
+        if first == second:
+            continue
+        missing = [item for item in first if item not in second]
+        additional = [item for item in second if item not in first]
+        if not missing and not additional:
+            differences.append(f"{scope}: different order")
+        else:
+            differences.append(f"{scope}: missing {missing}, additional {additional}")
+    return differences
+
+
+def _cpp_literal(value: Any, as_float: bool) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if as_float:
+        return repr(float(value))
+    return str(value)
+
+
+def _cpp_string(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'std::string("{escaped}")'
+
+
+def _is_string_literal(value: Any) -> bool:
+    return (
+        isinstance(value, str)
+        and len(value) >= 2
+        and value.startswith('"')
+        and value.endswith('"')
+        and '"' not in value[1:-1]
+    )
+
+
+def _is_number(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def runtime_value(
+    parameter: str,
+    values: List[Any],
+    variants: List[Dict[str, str]],
+    context: str,
+) -> str:
+    """
+    C++ expression that evaluates to the value of the parameter for the
+    variant selected via the environment variables of the executable. The
+    environment is only read the first time the expression is evaluated, the
+    value is kept in a static variable. This matters for parameters that are
+    used inside the lambdas evaluated for every event, e.g. {is_wjets} in
+    met.ApplyRecoilCorrections_variations, where every further evaluation
+    only returns the stored value. Parameters inside a string literal are
+    spliced into the literal as a string concatenation.
+
+    Raises a ValueError if the values cannot be represented as a runtime
+    lookup.
+    """
+    keys = [
+        key
+        for key in runtime_variables
+        if len(set(variant[key] for variant in variants)) > 1
+    ]
+    if all(isinstance(value, bool) for value in values):
+        literals = [_cpp_literal(value, False) for value in values]
+    elif context == "quoted" and all(isinstance(value, str) for value in values):
+        literals = [_cpp_string(value) for value in values]
+    elif context == "raw" and all(_is_string_literal(value) for value in values):
+        # parameters that carry their own quotes, e.g. correction files
+        literals = [f"std::string({value})" for value in values]
+    elif context == "raw" and all(_is_number(value) for value in values):
+        as_float = not all(
+            isinstance(value, int) or (isinstance(value, str) and value.isdigit())
+            for value in values
+        )
+        literals = [_cpp_literal(value, as_float) for value in values]
+    else:
+        raise ValueError(
+            f"parameter {parameter} has values {values} that cannot be selected "
+            + "at runtime"
+        )
+    # only look up the variables the value actually depends on, e.g. only
+    # the era for correction files
+    for key in keys:
+        selections = set(variant[key] for variant in variants)
+        pairs = set(zip((variant[key] for variant in variants), literals))
+        if len(pairs) == len(selections):
+            keys = [key]
+            break
+    table = {}
+    for variant, literal in zip(variants, literals):
+        table[tuple(variant[key] for key in keys)] = literal
+    lines = []
+    for key in keys:
+        lines.append(
+            f'const char *{key}_env = std::getenv("{runtime_variables[key]}"); '
+            + f'const std::string {key} = {key}_env ? {key}_env : ""; '
+        )
+    for selection, literal in table.items():
+        condition = " && ".join(
+            f'{key} == "{value}"' for key, value in zip(keys, selection)
+        )
+        lines.append(f"if ({condition}) return {literal}; ")
+    allowed = ", ".join("/".join(selection) for selection in table)
+    names = "/".join(runtime_variables[key] for key in keys)
+    lines.append(
+        f'throw std::runtime_error("{names} has to be set to one of {allowed}"); '
+    )
+    # the lookup is resolved once per use of the parameter and kept in a
+    # function local static, which is initialized thread safe
+    expression = (
+        "[]() -> const auto & { static const auto value = []() { "
+        + "".join(lines)
+        + "}(); return value; }()"
+    )
+    if context == "quoted":
+        # close the string literal of the call, concatenate and reopen it
+        return f'" + {expression} + "'
+    return expression
+
+
+def runtime_vector(
+    parameter: str,
+    values: List[Any],
+    variants: List[Dict[str, str]],
+    calls: List[str],
+) -> List[Any]:
+    """
+    Entries of a vector parameter, whose values are selected at runtime like
+    in runtime_value. The vector producers configured by the parameter are
+    kept, every entry that differs between the variants is replaced by a
+    runtime lookup of its values, with the context given by the calls of the
+    vector producers. For vector producers configured by a list of dicts,
+    only the values used in the calls are looked up, the other values (e.g.
+    the names of the outputs) have to be the same for all variants.
+
+    Raises a ValueError if the number of entries differs or an entry cannot
+    be represented as a runtime lookup.
+    """
+    if not all(
+        isinstance(value, (list, tuple)) and len(value) == len(values[0])
+        for value in values
+    ):
+        raise ValueError(
+            f"vector parameter {parameter} has a different number of entries"
+        )
+    entries = []
+    for index, elements in enumerate(zip(*values)):
+        if all(element == elements[0] for element in elements):
+            entries.append(elements[0])
+            continue
+        if not all(isinstance(element, dict) for element in elements):
+            contexts = _call_contexts(calls, parameter)
+            if len(contexts) != 1:
+                raise ValueError(
+                    f"entry {index} of {parameter} is used as {sorted(contexts)}"
+                )
+            entries.append(
+                runtime_value(
+                    f"{parameter}[{index}]", list(elements), variants, contexts.pop()
+                )
+            )
+            continue
+        if any(list(element) != list(elements[0]) for element in elements):
+            raise ValueError(f"entry {index} of {parameter} has different keys")
+        entry = {}
+        for key in elements[0]:
+            key_values = [element[key] for element in elements]
+            if all(value == key_values[0] for value in key_values):
+                entry[key] = key_values[0]
+                continue
+            contexts = _call_contexts(calls, key)
+            if len(contexts) != 1:
+                # keys that are not used in the calls name the outputs
+                raise ValueError(
+                    f"{key} of entry {index} of {parameter} differs and is used "
+                    + f"as {sorted(contexts) or 'output name'}"
+                )
+            entry[key] = runtime_value(
+                f"{parameter}[{index}].{key}", key_values, variants, contexts.pop()
+            )
+        entries.append(entry)
+    return entries
+
+
+def merge_configurations(
+    configurations: List[Configuration], variants: List[Dict[str, str]]
+) -> Configuration:
+    """
+    Merge the expanded configurations of several variants (e.g. the samples
+    of a family or several eras) into one configuration, whose executable
+    selects the variant at runtime via the environment variables in
+    runtime_variables. The variants are given as dicts with the sample and
+    the era of each configuration.
+
+    The configurations must only differ in parameters that are scalars used
+    in producer calls, or in the values of the entries of vector producers,
+    see runtime_vector. Differences in the producers, shifts or outputs, or in
+    the number of entries or the output names of vector producers raise a
+    ValueError listing all of them. The first configuration is modified in
+    place and returned.
+    """
+    if len(configurations) != len(variants):
+        raise ValueError("every configuration needs exactly one variant")
+    merged = configurations[0]
+    if len(configurations) == 1:
+        return merged
+    blockers = []
+    reference = _structure(merged)
+    for configuration, variant in zip(configurations[1:], variants[1:]):
+        structure = _structure(configuration)
+        for key in reference:
+            blockers.extend(
+                f"{key} of {variant}: {difference}"
+                for difference in _differences(reference[key], structure[key])
+            )
+    if blockers:
+        raise ValueError(
+            "Configurations cannot be merged:\n  " + "\n  ".join(blockers)
+        )
+    usage = parameter_usage(merged)
+    calls = vector_calls(merged)
+    for scope in configuration_scopes(merged):
+        for shift, parameters in merged.config_parameters[scope].items():
+            for parameter in list(parameters):
+                values = [
+                    configuration.config_parameters[scope][shift].get(parameter)
+                    for configuration in configurations
+                ]
+                if all(value == values[0] for value in values):
+                    continue
+                contexts = usage.get(parameter, set())
+                if not contexts:
+                    # not used in any call, does not end up in the code
+                    continue
+                if contexts == {"vector"}:
+                    try:
+                        parameters[parameter] = runtime_vector(
+                            parameter, values, variants, calls[parameter]
+                        )
+                    except ValueError as error:
+                        blockers.append(f"{scope}/{shift}: {error}")
+                    continue
+                if len(contexts) > 1:
+                    blockers.append(
+                        f"{scope}/{shift}: {parameter} is used as {sorted(contexts)}"
+                    )
+                    continue
+                try:
+                    parameters[parameter] = runtime_value(
+                        parameter, values, variants, next(iter(contexts))
+                    )
+                except ValueError as error:
+                    blockers.append(f"{scope}/{shift}: {error}")
+    if blockers:
+        raise ValueError(
+            "Configurations cannot be merged:\n  " + "\n  ".join(blockers)
+        )
+    return merged
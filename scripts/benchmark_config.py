@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the configuration building and code generation of the tau
+analysis for all combinations of eras, samples and scope sets.
+
+For every combination the time spent in build_config and in the code
+generation, the number of shifts and producers and the size of the generated
+code are recorded. The results can be compared against a stored baseline to
+catch growth of the configurations early.
+
+Run from the CROWN base directory, e.g.
+
+    python analysis_configurations/tau/scripts/benchmark_config.py \\
+        --baseline benchmark_baseline.json --output benchmark.json
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# the CROWN base directory has to be importable
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+)
+
+from code_generation.code_generation import CodeGenerator  # noqa: E402
+from analysis_configurations.tau import generate  # noqa: E402
+from analysis_configurations.tau import config_inspection  # noqa: E402
+from analysis_configurations.tau.fresh_process import (  # noqa: E402
+    run_in_fresh_processes,
+)
+
+# quantities that are compared against the baseline with a relative tolerance
+timing_quantities = ["build_time", "generation_time"]
+size_quantities = ["code_size"]
+# quantities that are expected to stay identical
+count_quantities = ["n_shifts", "n_producers"]
+
+
+def folder_size(folder):
+    size = 0
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            size += os.path.getsize(os.path.join(root, filename))
+    return size
+
+
+def benchmark_build(args, sample, era, scopes):
+    # build and generate the code of a single combination once
+    config = importlib.import_module(
+        f"analysis_configurations.{generate.analysis_name}.{args.config}"
+    )
+    shifts = set([shift.lower() for shift in args.shifts])
+    result = {}
+    start = time.perf_counter()
+    configuration = config.build_config(
+        era,
+        sample,
+        scopes,
+        shifts,
+        generate.available_samples,
+        generate.available_eras,
+        generate.available_scopes,
+    )
+    result["build_time"] = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as output_folder:
+        start = time.perf_counter()
+        generator = CodeGenerator(
+            main_template_path=args.template,
+            sub_template_path=args.subset_template,
+            configuration=configuration,
+            executable_name=f"{args.config}_{sample}_{era}",
+            analysis_name=generate.analysis_name,
+            config_name=args.config,
+            output_folder=output_folder,
+            threads=1,
+        )
+        generator.generate_code()
+        result["generation_time"] = time.perf_counter() - start
+        result["code_size"] = folder_size(output_folder)
+    result["n_shifts"] = len(
+        set().union(*config_inspection.shifts(configuration).values())
+    )
+    result["n_producers"] = sum(
+        len(producers)
+        for producers in config_inspection.producers(configuration).values()
+    )
+    return result
+
+
+def benchmark_combination(args, sample, era, scopes):
+    # every repetition runs in its own process, one at a time, so that the
+    # shifts applied to the shared producers by one build do not change the
+    # results of the next and the timings are not disturbed by each other
+    results = run_in_fresh_processes(
+        benchmark_build, [(args, sample, era, scopes)] * args.repeat, 1
+    )
+    result = dict(results[-1])
+    # the minimum is the least noisy estimate of the time needed
+    for quantity in timing_quantities:
+        result[quantity] = min(repeated[quantity] for repeated in results)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of human readable regressions with respect to the baseline.
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            continue
+        reference = baseline[key]
+        for quantity in timing_quantities + size_quantities:
+            if result[quantity] > reference[quantity] * (1.0 + tolerance):
+                regressions.append(
+                    f"{key}: {quantity} {reference[quantity]:.6g} -> {result[quantity]:.6g}"
+                )
+        for quantity in count_quantities:
+            if result[quantity] != reference[quantity]:
+                regressions.append(
+                    f"{key}: {quantity} {reference[quantity]} -> {result[quantity]}"
+                )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark configuration building and code generation."
+    )
+    parser.add_argument("--config", default="config")
+    parser.add_argument("--samples", nargs="+", default=generate.available_samples)
+    parser.add_argument("--eras", nargs="+", default=generate.available_eras)
+    parser.add_argument(
+        "--scope-sets",
+        nargs="+",
+        default=[",".join(generate.available_scopes)] + generate.available_scopes,
+        help="comma separated scopes, every set is benchmarked separately",
+    )
+    parser.add_argument("--shifts", nargs="+", default=["all"])
+    parser.add_argument(
+        "--template", default="code_generation/analysis_template.cxx"
+    )
+    parser.add_argument(
+        "--subset-template", default="code_generation/subset_template.cxx"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default="benchmark_config.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative growth of timings and code size",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # import the configuration once, the forked processes share the module
+    importlib.import_module(
+        f"analysis_configurations.{generate.analysis_name}.{args.config}"
+    )
+    results = {}
+    for era in args.eras:
+        for sample in args.samples:
+            for scope_set in args.scope_sets:
+                scopes = scope_set.split(",")
+                key = f"{era}/{sample}/{scope_set}"
+                results[key] = benchmark_combination(args, sample, era, scopes)
+                print(
+                    f"{key}: build {results[key]['build_time']:.2f} s, "
+                    + f"generation {results[key]['generation_time']:.2f} s, "
+                    + f"{results[key]['n_shifts']} shifts, "
+                    + f"{results[key]['n_producers']} producers, "
+                    + f"{results[key]['code_size'] / 1024:.0f} kB code"
+                )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if len(regressions) == 0:
+        print(f"No regressions with respect to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of the FastMTT kernel of CROWN on synthetic ditau events.
+
+For every channel, reproducible ditau events are generated with the inputs of
+the FastMTTQuantities producers (visible tau decay products, MET and MET
+covariance). quantities::p4_fastmtt is run on them single- and multi-threaded
+in an RDataFrame. The throughput, percentiles of the latency per event and
+the bias and resolution of the FastMTT mass with respect to the generated
+mass are recorded. The results can be compared against a stored baseline.
+
+The CROWN sources needed by the kernel are compiled with ACLiC, so only ROOT
+with numpy support and the CROWN source tree are needed, no CROWN build. Run
+from the CROWN base directory, e.g.
+
+    python analysis_configurations/tau/scripts/benchmark_fastmtt.py \\
+        --baseline fastmtt_baseline.json --output fastmtt.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+import numpy as np
+
+# the CROWN base directory
+crown_base = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "..")
+)
+
+tau_mass = 1.77686
+lepton_masses = {"e": 0.000511, "m": 0.105658}
+# hadronic decay modes with their relative frequency and the range of the
+# visible mass
+hadronic_decay_modes = {
+    0: (0.25, 0.13957, 0.13957),
+    1: (0.50, 0.3, 1.3),
+    10: (0.15, 0.8, 1.5),
+    11: (0.10, 0.9, 1.6),
+}
+# minimal visible pt and maximal |eta| of the legs
+leg_selection = {"e": (25.0, 2.1), "m": (20.0, 2.1), "t": (30.0, 2.3)}
+# the letters of a channel are its legs in the order of the FastMTT inputs
+channels = ["mt", "et", "tt", "em"]
+
+fastmtt_inputs = [
+    "pt_1",
+    "pt_2",
+    "eta_1",
+    "eta_2",
+    "phi_1",
+    "phi_2",
+    "mass_1",
+    "mass_2",
+    "met",
+    "metphi",
+    "metcov00",
+    "metcov01",
+    "metcov11",
+    "tau_decaymode_1",
+    "tau_decaymode_2",
+]
+
+# quantities that are compared against the baseline with a relative tolerance,
+# larger values are better
+throughput_quantities = ["events_per_second"]
+# quantities of the mass that are compared with an absolute tolerance
+mass_quantities = ["mass_bias", "mass_resolution"]
+
+timing_code = """
+#include <chrono>
+namespace fastmtt_benchmark {
+double now() {
+    return std::chrono::duration<double>(
+               std::chrono::steady_clock::now().time_since_epoch())
+        .count();
+}
+template <typename T> T after(const T &value, const double start) {
+    return value;
+}
+template <typename T> double elapsed(const T &result, const double start) {
+    return now() - start;
+}
+} // namespace fastmtt_benchmark
+"""
+
+
+def boost(px, py, pz, energy, bx, by, bz):
+    """
+    Lorentz boost of four-momenta by the velocity (bx, by, bz).
+    """
+    b2 = bx**2 + by**2 + bz**2
+    gamma = 1.0 / np.sqrt(1.0 - b2)
+    bp = bx * px + by * py + bz * pz
+    factor = np.where(b2 > 0.0, (gamma - 1.0) * bp / np.maximum(b2, 1e-300), 0.0)
+    return (
+        px + factor * bx + gamma * bx * energy,
+        py + factor * by + gamma * by * energy,
+        pz + factor * bz + gamma * bz * energy,
+        gamma * (energy + bp),
+    )
+
+
+def leptonic_fractions(rng, n):
+    """
+    Visible momentum fractions of leptonic tau decays, sampled from the
+    spectrum of unpolarised taus, 5/3 - 3 x^2 + 4/3 x^3.
+    """
+    fractions = np.empty(0)
+    while len(fractions) < n:
+        x = rng.uniform(0.0, 1.0, 2 * n)
+        spectrum = 5.0 / 3.0 - 3.0 * x**2 + 4.0 / 3.0 * x**3
+        accept = rng.uniform(0.0, 5.0 / 3.0, 2 * n) < spectrum
+        fractions = np.concatenate([fractions, x[accept]])
+    return fractions[:n]
+
+
+def decay_tau(rng, leg, n):
+    """
+    Visible mass, decay mode and visible momentum fraction of n tau decays
+    into the leg type e, m or t.
+    """
+    if leg in lepton_masses:
+        return (
+            np.full(n, lepton_masses[leg]),
+            np.full(n, -1, dtype=np.int32),
+            leptonic_fractions(rng, n),
+        )
+    modes = list(hadronic_decay_modes)
+    weights = np.array([hadronic_decay_modes[mode][0] for mode in modes])
+    decay_modes = rng.choice(modes, size=n, p=weights / weights.sum())
+    masses = np.empty(n)
+    for mode in modes:
+        selected = decay_modes == mode
+        _, low, high = hadronic_decay_modes[mode]
+        masses[selected] = rng.uniform(low, high, selected.sum())
+    # collinear two body decay of a polarisation averaged tau
+    fractions = rng.uniform(masses**2 / tau_mass**2, 1.0)
+    return masses, decay_modes.astype(np.int32), fractions
+
+
+def generate_candidates(rng, channel, n, masses, met_resolution):
+    """
+    Generate n ditau candidates without selection. Returns a dict of the
+    FastMTT inputs and the generated mass.
+    """
+    true_mass = rng.choice(masses, size=n)
+    # kinematics of the ditau system in the lab frame
+    pt = rng.exponential(30.0, n)
+    rapidity = rng.normal(0.0, 1.5, n)
+    phi = rng.uniform(-np.pi, np.pi, n)
+    mt = np.sqrt(true_mass**2 + pt**2)
+    energy = mt * np.cosh(rapidity)
+    bx = pt * np.cos(phi) / energy
+    by = pt * np.sin(phi) / energy
+    bz = mt * np.sinh(rapidity) / energy
+    # back to back taus in the rest frame
+    momentum = np.sqrt(true_mass**2 / 4.0 - tau_mass**2)
+    cos_theta = rng.uniform(-1.0, 1.0, n)
+    sin_theta = np.sqrt(1.0 - cos_theta**2)
+    phi_star = rng.uniform(-np.pi, np.pi, n)
+    direction = (
+        momentum * sin_theta * np.cos(phi_star),
+        momentum * sin_theta * np.sin(phi_star),
+        momentum * cos_theta,
+    )
+    tau_energy = np.sqrt(momentum**2 + tau_mass**2)
+    inputs = {}
+    neutrino_x = np.zeros(n)
+    neutrino_y = np.zeros(n)
+    for index, (leg, sign) in enumerate(zip(channel, (1.0, -1.0))):
+        px, py, pz, _ = boost(
+            sign * direction[0],
+            sign * direction[1],
+            sign * direction[2],
+            tau_energy,
+            bx,
+            by,
+            bz,
+        )
+        visible_mass, decay_mode, fraction = decay_tau(rng, leg, n)
+        tau_pt = np.hypot(px, py)
+        inputs[f"pt_{index + 1}"] = fraction * tau_pt
+        inputs[f"eta_{index + 1}"] = np.arcsinh(pz / tau_pt)
+        inputs[f"phi_{index + 1}"] = np.arctan2(py, px)
+        inputs[f"mass_{index + 1}"] = visible_mass
+        inputs[f"tau_decaymode_{index + 1}"] = decay_mode
+        neutrino_x += (1.0 - fraction) * px
+        neutrino_y += (1.0 - fraction) * py
+    # smear the MET with a random covariance per event
+    sigma_x = met_resolution * rng.uniform(0.7, 1.3, n)
+    sigma_y = met_resolution * rng.uniform(0.7, 1.3, n)
+    correlation = rng.uniform(-0.3, 0.3, n)
+    smear_x = rng.normal(0.0, 1.0, n)
+    smear_y = rng.normal(0.0, 1.0, n)
+    met_x = neutrino_x + sigma_x * smear_x
+    met_y = (
+        neutrino_y
+        + sigma_y * correlation * smear_x
+        + sigma_y * np.sqrt(1.0 - correlation**2) * smear_y
+    )
+    inputs["met"] = np.hypot(met_x, met_y)
+    inputs["metphi"] = np.arctan2(met_y, met_x)
+    inputs["metcov00"] = sigma_x**2
+    inputs["metcov01"] = correlation * sigma_x * sigma_y
+    inputs["metcov11"] = sigma_y**2
+    inputs["true_mass"] = true_mass
+    return inputs
+
+
+def generate_events(channel, n_events, seed, masses, met_resolution):
+    """
+    Reproducible selected ditau events of a channel, as a dict of contiguous
+    numpy arrays with the types of the FastMTT inputs.
+    """
+    rng = np.random.default_rng([seed, channels.index(channel)])
+    chunks = []
+    n_selected = 0
+    while n_selected < n_events:
+        candidates = generate_candidates(
+            rng, channel, n_events, masses, met_resolution
+        )
+        selected = np.ones(n_events, dtype=bool)
+        for index, leg in enumerate(channel):
+            min_pt, max_eta = leg_selection[leg]
+            selected &= candidates[f"pt_{index + 1}"] > min_pt
+            selected &= np.abs(candidates[f"eta_{index + 1}"]) < max_eta
+        chunks.append({key: values[selected] for key, values in candidates.items()})
+        n_selected += selected.sum()
+    events = {}
+    for key in chunks[0]:
+        values = np.concatenate([chunk[key] for chunk in chunks])[:n_events]
+        dtype = np.int32 if key.startswith("tau_decaymode") else np.float32
+        events[key] = np.ascontiguousarray(values, dtype=dtype)
+    return events
+
+
+def load_kernel(ROOT, sources, include_paths, build_dir):
+    """
+    Compile the CROWN sources needed by the FastMTT kernel with ACLiC.
+    """
+    os.makedirs(build_dir, exist_ok=True)
+    for path in [crown_base, os.path.join(crown_base, "include")] + include_paths:
+        ROOT.gSystem.AddIncludePath(f"-I{path}")
+    for source in sources:
+        if not ROOT.gSystem.CompileMacro(source, "kO", "", build_dir):
+            raise RuntimeError(f"Compiling {source} failed")
+    ROOT.gInterpreter.Declare(timing_code)
+
+
+def run_benchmark(ROOT, events, channel, threads):
+    """
+    Run FastMTT on the events with the given number of threads. The latency
+    of an event is the time between reading its first input and the end of
+    its FastMTT evaluation, the throughput is measured from the start of the
+    first event to the end of the last one, so it does not include jitting.
+    """
+    if threads > 1:
+        ROOT.EnableImplicitMT(threads)
+    else:
+        ROOT.DisableImplicitMT()
+    from_numpy = getattr(ROOT.RDF, "FromNumpy", None) or ROOT.RDF.MakeNumpyDataFrame
+    df = from_numpy(events)
+    df = df.Define("fastmtt_start", "fastmtt_benchmark::now()")
+    df = df.Define("pt_1_timed", "fastmtt_benchmark::after(pt_1, fastmtt_start)")
+    inputs = ["pt_1_timed"] + fastmtt_inputs[1:]
+    df = ROOT.quantities.p4_fastmtt(
+        ROOT.RDF.AsRNode(df), "p4_fastmtt", *inputs, channel
+    )
+    df = df.Define(
+        "fastmtt_latency",
+        "fastmtt_benchmark::elapsed(p4_fastmtt, fastmtt_start)",
+    )
+    df = df.Define("m_fastmtt", "float(p4_fastmtt.M())")
+    columns = df.AsNumpy(["fastmtt_start", "fastmtt_latency", "m_fastmtt"])
+    end = columns["fastmtt_start"] + columns["fastmtt_latency"]
+    duration = end.max() - columns["fastmtt_start"].min()
+    latency = 1e3 * columns["fastmtt_latency"]
+    ratio = columns["m_fastmtt"] / events["true_mass"]
+    quantile_16, quantile_50, quantile_84 = np.quantile(ratio, [0.16, 0.5, 0.84])
+    return {
+        "events_per_second": len(latency) / duration,
+        "latency_ms_p50": float(np.percentile(latency, 50)),
+        "latency_ms_p90": float(np.percentile(latency, 90)),
+        "latency_ms_p99": float(np.percentile(latency, 99)),
+        "mass_bias": float(quantile_50 - 1.0),
+        "mass_resolution": float((quantile_84 - quantile_16) / 2.0),
+    }
+
+
+def compare(results, baseline, tolerance, mass_tolerance):
+    """
+    Returns a list of human readable regressions with respect to the baseline.
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            continue
+        reference = baseline[key]
+        for quantity in throughput_quantities:
+            if result[quantity] < reference[quantity] * (1.0 - tolerance):
+                regressions.append(
+                    f"{key}: {quantity} {reference[quantity]:.6g} -> {result[quantity]:.6g}"
+                )
+        for quantity in mass_quantities:
+            if abs(result[quantity] - reference[quantity]) > mass_tolerance:
+                regressions.append(
+                    f"{key}: {quantity} {reference[quantity]:.4f} -> {result[quantity]:.4f}"
+                )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the FastMTT kernel on synthetic ditau events."
+    )
+    parser.add_argument(
+        "--channels", nargs="+", default=channels, choices=channels
+    )
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--masses",
+        type=float,
+        nargs="+",
+        default=[91.19, 125.0],
+        help="generated ditau masses in GeV, chosen with equal probability",
+    )
+    parser.add_argument(
+        "--met-resolution",
+        type=float,
+        default=20.0,
+        help="average resolution of the MET components in GeV",
+    )
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1]
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="+",
+        default=None,
+        help="CROWN sources to compile, by default the SVFit sources, the "
+        + "logger and the quantities",
+    )
+    parser.add_argument(
+        "--include-paths",
+        nargs="+",
+        default=[],
+        help="additional include paths, e.g. of spdlog",
+    )
+    parser.add_argument("--build-dir", default="fastmtt_benchmark_build")
+    parser.add_argument("--output", default="benchmark_fastmtt.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative loss of throughput",
+    )
+    parser.add_argument(
+        "--mass-tolerance",
+        type=float,
+        default=0.005,
+        help="allowed absolute change of the relative mass bias and resolution",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    import ROOT
+
+    ROOT.gROOT.SetBatch(True)
+    sources = args.sources
+    if sources is None:
+        sources = sorted(glob.glob(os.path.join(crown_base, "src", "SVFit", "*.cxx")))
+        sources += [
+            os.path.join(crown_base, "src", "utility", "Logger.cxx"),
+            os.path.join(crown_base, "src", "quantities.cxx"),
+        ]
+    load_kernel(ROOT, sources, args.include_paths, args.build_dir)
+    results = {}
+    for channel in args.channels:
+        events = generate_events(
+            channel, args.events, args.seed, args.masses, args.met_resolution
+        )
+        for threads in args.threads:
+            key = f"{channel}/{threads}"
+            results[key] = run_benchmark(ROOT, events, channel, threads)
+            print(
+                f"{key}: {results[key]['events_per_second']:.0f} events/s, "
+                + f"latency p50 {results[key]['latency_ms_p50']:.2f} ms, "
+                + f"p99 {results[key]['latency_ms_p99']:.2f} ms, "
+                + f"mass bias {results[key]['mass_bias']:+.4f}, "
+                + f"resolution {results[key]['mass_resolution']:.4f}"
+            )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.mass_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if len(regressions) == 0:
+        print(f"No regressions with respect to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
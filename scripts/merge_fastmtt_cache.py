@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Merge the new FastMTT results written by the executables of the fastmtt
+friend configuration into the persistent caches, see fastmtt_cache.py.
+
+For every cache <name>.fastmtt in the cache folder, all files
+<name>_<scope>.fastmtt_new* are merged into it and removed afterwards. The
+name is <era>_<sample>, followed by _<precision> if a FastMTT precision is set.
+Run from the CROWN base directory, e.g.
+
+    python analysis_configurations/tau/scripts/merge_fastmtt_cache.py \\
+        --cache-folder /path/to/fastmtt_cache
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+# the CROWN base directory has to be importable
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+)
+
+from analysis_configurations.tau import fastmtt_cache  # noqa: E402
+
+
+def caches_with_entries(cache_folder):
+    """
+    Returns a dict of the cache files and the files with new entries for them.
+    """
+    caches = {}
+    for entry_file in sorted(glob.glob(os.path.join(cache_folder, "*.fastmtt_new*"))):
+        # <name>_<scope>.fastmtt_new<suffix>
+        stem = os.path.basename(entry_file).split(".fastmtt_new")[0]
+        cache = os.path.join(cache_folder, stem.rsplit("_", 1)[0] + ".fastmtt")
+        caches.setdefault(cache, []).append(entry_file)
+    return caches
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Merge new FastMTT results into the persistent caches."
+    )
+    parser.add_argument("--cache-folder", required=True)
+    parser.add_argument(
+        "--keep",
+        action="store_true",
+        help="keep the files with new entries after merging",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    caches = caches_with_entries(args.cache_folder)
+    if len(caches) == 0:
+        print(f"No new entries in {args.cache_folder}")
+        return 0
+    for cache, entry_files in sorted(caches.items()):
+        n_entries = fastmtt_cache.merge_cache(cache, entry_files)
+        print(
+            f"{os.path.basename(cache)}: merged {len(entry_files)} files, "
+            + f"{n_entries} entries"
+        )
+        if not args.keep:
+            for entry_file in entry_files:
+                os.remove(entry_file)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+import json
+import os
+from typing import Dict, List, Set
+
+from code_generation.configuration import Configuration
+from code_generation.producer import Producer
+from .code_size import shift_group
+from .config_inspection import parameter_pattern, producer_inputs, vector_parameters
+from .config_inspection import producers as configuration_producers
+from .config_inspection import scopes as configuration_scopes
+from .config_inspection import shifts as configuration_shifts
+
+# relative cost of a producer call compared to a simple producer, matched on
+# the beginning of the producer name. Everything else counts as 1.
+producer_costs = {
+    "p4_fastmtt": 50.0,
+}
+# relative cost of writing one output column compared to a simple producer
+column_cost = 1.0
+
+
+def producer_cost(producer: Producer) -> float:
+    for prefix, cost in producer_costs.items():
+        if producer.name.startswith(prefix):
+            return cost
+    return 1.0
+
+
+def _parameters(producer: Producer) -> Set[str]:
+    # parameters used in the call of a producer or to configure a vector
+    # producer
+    return set(parameter_pattern.findall(producer.call or "")) | set(
+        vector_parameters(producer)
+    )
+
+
+def _changed_parameters(
+    configuration: Configuration, scope: str, shift: str
+) -> Set[str]:
+    # parameters of a scope with a different value for the shift
+    parameters = configuration.config_parameters[scope]
+    nominal = parameters.get("nominal", {})
+    return set(
+        parameter
+        for parameter, value in parameters.get(shift, {}).items()
+        if parameter not in nominal or nominal[parameter] != value
+    )
+
+
+def _carries_shift(quantities, shift: str, scope: str) -> bool:
+    return any(shift in quantity.get_shifts(scope) for quantity in quantities)
+
+
+def nominal_cost(configuration: Configuration) -> float:
+    """
+    Estimated cost of the nominal path of an expanded configuration.
+    """
+    producers = configuration_producers(configuration)
+    return sum(
+        sum(producer_cost(producer) for producer in scope_producers)
+        + column_cost * len(configuration.outputs.get(scope, []))
+        for scope, scope_producers in producers.items()
+    )
+
+
+def plan_shifts(configuration: Configuration) -> Dict[str, dict]:
+    """
+    For every shift of an expanded configuration, determine the producers that
+    are executed again per scope, the output columns that are duplicated per
+    scope and the estimated cost relative to the nominal path.
+
+    A producer is executed again, if one of its inputs or outputs is shifted
+    directly, if it uses a parameter changed by the shift, or if one of its
+    inputs is an output of a producer that is executed again. As in the code
+    generation, quantities are followed as objects, not by their name. Outputs
+    of the global scope are inputs of all other scopes. The outputs of vector
+    producers are only known after the code generation, they are listed as
+    <producer>:* among the columns.
+    """
+    producers = configuration_producers(configuration)
+    nominal = nominal_cost(configuration)
+    shift_names = sorted(
+        set().union(*configuration_shifts(configuration).values())
+    )
+    plan = {}
+    for shift in shift_names:
+        entry = {"producers": {}, "columns": {}, "cost": 0.0}
+        global_shifted = set()
+        for scope in configuration_scopes(configuration):
+            shifted = set() if scope == "global" else set(global_shifted)
+            changed = _changed_parameters(configuration, scope, shift)
+            executed = []
+            vector_columns = []
+            for producer in producers[scope]:
+                inputs = producer_inputs(producer, scope)
+                outputs = producer.output or []
+                if (
+                    any(id(quantity) in shifted for quantity in inputs)
+                    or _carries_shift(inputs, shift, scope)
+                    or _carries_shift(outputs, shift, scope)
+                    or changed & _parameters(producer)
+                ):
+                    executed.append(producer)
+                    shifted.update(id(quantity) for quantity in outputs)
+                    if not outputs and hasattr(producer, "vec_config"):
+                        vector_columns.append(f"{producer.name}:*")
+            if scope == "global":
+                global_shifted = shifted
+            columns = sorted(
+                quantity.name
+                for quantity in configuration.outputs.get(scope, [])
+                if id(quantity) in shifted
+            ) + (vector_columns if scope != "global" else [])
+            if executed:
+                entry["producers"][scope] = [producer.name for producer in executed]
+            if columns:
+                entry["columns"][scope] = columns
+            entry["cost"] += sum(producer_cost(producer) for producer in executed)
+            entry["cost"] += column_cost * len(columns)
+        entry["relative_cost"] = entry["cost"] / nominal if nominal else 0.0
+        plan[shift] = entry
+    return plan
+
+
+def noop_shifts(plan: Dict[str, dict]) -> List[str]:
+    """
+    Shifts of a plan that do not change any output column, e.g. because their
+    producers were removed for the sample.
+    """
+    return sorted(shift for shift, entry in plan.items() if not entry["columns"])
+
+
+def shard_shifts(plan: Dict[str, dict], n_shards: int) -> List[List[str]]:
+    """
+    Distribute the shifts of a plan onto at most n_shards sets of similar
+    estimated cost. The up and down variations of a shift are kept together.
+    The most expensive groups are assigned first, each to the currently
+    cheapest shard. Empty shards are dropped.
+    """
+    groups: Dict[str, List[str]] = {}
+    for shift in sorted(plan):
+        groups.setdefault(shift_group(shift), []).append(shift)
+    ordered = sorted(
+        groups.values(),
+        key=lambda shifts: -sum(plan[shift]["cost"] for shift in shifts),
+    )
+    shards: List[dict] = [{"cost": 0.0, "shifts": []} for _ in range(max(1, n_shards))]
+    for shifts in ordered:
+        shard = min(shards, key=lambda shard: shard["cost"])
+        shard["cost"] += sum(plan[shift]["cost"] for shift in shifts)
+        shard["shifts"].extend(shifts)
+    return [shard["shifts"] for shard in shards if shard["shifts"]]
+
+
+def format_plan(plan: Dict[str, dict]) -> str:
+    """
+    Human readable summary of a shift plan, the most expensive shifts first.
+    """
+    lines = [
+        f"{'shift':<45} {'rel. cost':>9} {'producers':>9} {'columns':>7}",
+    ]
+    ordered = sorted(plan.items(), key=lambda item: -item[1]["cost"])
+    for shift, entry in ordered:
+        n_producers = sum(len(names) for names in entry["producers"].values())
+        n_columns = sum(len(names) for names in entry["columns"].values())
+        lines.append(
+            f"{shift.lstrip('_'):<45} {entry['relative_cost']:>9.3f} "
+            + f"{n_producers:>9} {n_columns:>7}"
+        )
+    lines.append(
+        f"{'total':<45} {sum(entry['relative_cost'] for entry in plan.values()):>9.3f}"
+    )
+    for shift, entry in ordered:
+        lines.append("")
+        lines.append(f"{shift.lstrip('_')}:")
+        for scope, names in entry["producers"].items():
+            lines.append(f"  {scope} producers: {', '.join(names)}")
+        for scope, names in entry["columns"].items():
+            lines.append(f"  {scope} columns: {', '.join(names)}")
+    return "\n".join(lines)
+
+
+def write_plan(filename: str, plan: Dict[str, dict]):
+    """
+    Write the plan as json and the human readable summary next to it, with
+    the extension .txt.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(plan, f, indent=4)
+    with open(os.path.splitext(filename)[0] + ".txt", "w") as f:
+        f.write(format_plan(plan) + "\n")
@@ -10,12 +10,48 @@ from .producers import taus as taus
 from .producers import jets as jets
 from .producers import triggers as triggers
 from .producers import electrons as electrons
+from .quantities import output as q
 from code_generation.configuration import Configuration
 from code_generation.systematics import SystematicShift
-from code_generation.modifiers import EraModifier
+from code_generation.modifiers import EraModifier, SampleModifier
 
 measure_tauES = False
 measure_elefakeES = False
+# evaluate the points of the tau energy scale measurement in the nominal event
+# loop and write them as array columns, instead of adding one shift per point
+scan_tauES = False
+# same for the electron energy scale measurement in the et, em and ee scopes
+scan_elefakeES = False
+
+
+def add_scan_threshold(
+    configuration: Configuration,
+    scopes: List[str],
+    parameter: str,
+    scan_parameter: str,
+    factors: List[float],
+):
+    """
+    Keep the pt threshold parameter of the selection of the scopes as
+    scan_parameter, which is applied to the points of an energy scale scan.
+    The embedding events are preselected with the threshold divided by the
+    largest scale factor of the scan.
+    """
+    for scope in scopes:
+        # scopes that are not generated have no parameters
+        if scope not in configuration.config_parameters:
+            continue
+        threshold = configuration.config_parameters[scope][parameter]
+        configuration.add_config_parameters(
+            scope,
+            {
+                scan_parameter: threshold,
+                # the points of the scan are only evaluated for embedding
+                parameter: SampleModifier(
+                    {"embedding": threshold / max(factors)}, default=threshold
+                ),
+            },
+        )
 
 
 def setup_embedding(configuration: Configuration, scopes: List[str]):
@@ -948,27 +984,61 @@ def setup_embedding(configuration: Configuration, scopes: List[str]):
             ),
         )
         tauESvariations = [-2.5 + 0.1 * i for i in range(0, 51)]
-        for tauESvariation in tauESvariations:
-            name = str(round(tauESvariation, 2)).replace("-", "minus").replace(".", "p")
-            configuration.add_shift(
-                SystematicShift(
-                    name=f"EMBtauESshift_{name}",
-                    shift_config={
-                        ("mt"): {
-                            "tau_ES_shift_DM0": 1.0
-                            + (round(tauESvariation / 100.0, 5)),
-                            "tau_ES_shift_DM1": 1.0
-                            + (round(tauESvariation / 100.0, 5)),
-                            "tau_ES_shift_DM10": 1.0
-                            + (round(tauESvariation / 100.0, 5)),
-                            "tau_ES_shift_DM11": 1.0
-                            + (round(tauESvariation / 100.0, 5)),
-                        }
-                    },
-                    producers={("mt"): taus.TauPtCorrection_byValue},
-                ),
-                samples=["embedding"],
+        if scan_tauES:
+            tauESfactors = [
+                1.0 + (round(tauESvariation / 100.0, 5))
+                for tauESvariation in tauESvariations
+            ]
+            configuration.add_config_parameters(
+                "mt",
+                {
+                    "tau_ES_scan_factors": ", ".join(
+                        str(factor) for factor in tauESfactors
+                    ),
+                },
             )
+            add_scan_threshold(
+                configuration,
+                ["mt"],
+                "min_tau_pt",
+                "tau_ES_scan_min_tau_pt",
+                tauESfactors,
+            )
+            configuration.add_modification_rule(
+                "mt",
+                AppendProducer(producers=embedding.TauESScan, samples=["embedding"]),
+            )
+            if configuration.sample == "embedding":
+                configuration.add_outputs(
+                    "mt",
+                    [
+                        q.tauES_scan_pt_2,
+                        q.tauES_scan_m_vis,
+                        q.tauES_scan_tau_pt_flag,
+                    ],
+                )
+        else:
+            for tauESvariation in tauESvariations:
+                name = str(round(tauESvariation, 2)).replace("-", "minus").replace(".", "p")
+                configuration.add_shift(
+                    SystematicShift(
+                        name=f"EMBtauESshift_{name}",
+                        shift_config={
+                            ("mt"): {
+                                "tau_ES_shift_DM0": 1.0
+                                + (round(tauESvariation / 100.0, 5)),
+                                "tau_ES_shift_DM1": 1.0
+                                + (round(tauESvariation / 100.0, 5)),
+                                "tau_ES_shift_DM10": 1.0
+                                + (round(tauESvariation / 100.0, 5)),
+                                "tau_ES_shift_DM11": 1.0
+                                + (round(tauESvariation / 100.0, 5)),
+                            }
+                        },
+                        producers={("mt"): taus.TauPtCorrection_byValue},
+                    ),
+                    samples=["embedding"],
+                )
     else:
         tauES_2016preVFP = {  # ToDo: Measure these values for 2016preVFP and add them to the configuration
             "up": 1.0 - 0.0,
@@ -1213,27 +1283,62 @@ def setup_embedding(configuration: Configuration, scopes: List[str]):
             ),
         )
         elefakeESvariations = [-1.5 + 0.05 * i for i in range(0, 51)]
-        for elefakeESvariation in elefakeESvariations:
-            name = (
-                str(round(elefakeESvariation, 2))
-                .replace("-", "minus")
-                .replace(".", "p")
+        if scan_elefakeES:
+            elefakeESfactors = [
+                1.0 + (round(elefakeESvariation / 100.0, 5))
+                for elefakeESvariation in elefakeESvariations
+            ]
+            configuration.add_config_parameters(
+                ["et", "em", "ee"],
+                {
+                    "ele_ES_scan_factors": ", ".join(
+                        str(factor) for factor in elefakeESfactors
+                    ),
+                },
             )
-            configuration.add_shift(
-                SystematicShift(
-                    name=f"EMBelefakeESshift_{name}",
-                    shift_config={
-                        ("global"): {
-                            "ele_energyscale_barrel": 1.0
-                            + (round(elefakeESvariation / 100.0, 5)),
-                            "ele_energyscale_endcap": 1.0
-                            + (round(elefakeESvariation / 100.0, 5)),
-                        }
-                    },
-                    producers={("global"): electrons.ElectronPtCorrectionEmbedding},
-                ),
-                samples=["embedding"],
+            add_scan_threshold(
+                configuration,
+                ["et", "em", "ee"],
+                "min_electron_pt",
+                "ele_ES_scan_min_electron_pt",
+                elefakeESfactors,
             )
+            configuration.add_modification_rule(
+                ["et", "em", "ee"],
+                AppendProducer(producers=embedding.EleESScan, samples=["embedding"]),
+            )
+            if configuration.sample == "embedding":
+                configuration.add_outputs(
+                    ["et", "em", "ee"],
+                    [
+                        q.eleES_scan_pt_1,
+                        q.eleES_scan_m_vis,
+                        q.eleES_scan_electron_pt_flag,
+                    ],
+                )
+                configuration.add_outputs("ee", q.eleES_scan_pt_2)
+        else:
+            for elefakeESvariation in elefakeESvariations:
+                name = (
+                    str(round(elefakeESvariation, 2))
+                    .replace("-", "minus")
+                    .replace(".", "p")
+                )
+                configuration.add_shift(
+                    SystematicShift(
+                        name=f"EMBelefakeESshift_{name}",
+                        shift_config={
+                            ("global"): {
+                                "ele_energyscale_barrel": 1.0
+                                + (round(elefakeESvariation / 100.0, 5)),
+                                "ele_energyscale_endcap": 1.0
+                                + (round(elefakeESvariation / 100.0, 5)),
+                            }
+                        },
+                        producers={("global"): electrons.ElectronPtCorrectionEmbedding},
+                    ),
+                    samples=["embedding"],
+                )
     else:
         ele_energyscale_2016preVFP = {  # ToDo: Set to sensible value
             "barrel": {
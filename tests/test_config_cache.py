@@ -0,0 +1,74 @@
+import os
+import sys
+
+import pytest
+
+# the CROWN base directory has to be importable
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+)
+
+from analysis_configurations.tau import config_cache  # noqa: E402
+
+
+class Producer:
+    def __init__(self, name, call):
+        self.name = name
+        self.call = call
+
+
+class Configuration:
+    def __init__(self, producers, parameters):
+        self.producers = producers
+        self.parameters = parameters
+
+
+@pytest.fixture(autouse=True)
+def code_generation_hash(monkeypatch):
+    # the hash of the code generation package is covered by source_hash
+    monkeypatch.setattr(config_cache, "code_generation_hash", lambda: "crown")
+
+
+def configuration(call="physicsobject::Cut({df}, {output})", pt=20.0):
+    return Configuration(
+        {"mt": [Producer("PtCut", call)]}, {"mt": {"min_pt": pt, "tags": {"a", "b"}}}
+    )
+
+
+def test_fingerprint_is_reproducible():
+    assert config_cache.configuration_fingerprint(
+        configuration()
+    ) == config_cache.configuration_fingerprint(configuration())
+
+
+def test_fingerprint_changes_with_configuration():
+    reference = config_cache.configuration_fingerprint(configuration())
+    assert config_cache.configuration_fingerprint(configuration(pt=25.0)) != reference
+    assert (
+        config_cache.configuration_fingerprint(configuration(call="other")) != reference
+    )
+
+
+def test_fingerprint_changes_with_template_contents():
+    reference = config_cache.configuration_fingerprint(
+        configuration(), b"template", 1
+    )
+    assert reference == config_cache.configuration_fingerprint(
+        configuration(), b"template", 1
+    )
+    assert reference != config_cache.configuration_fingerprint(
+        configuration(), b"changed template", 1
+    )
+    assert reference != config_cache.configuration_fingerprint(
+        configuration(), b"template", 2
+    )
+
+
+def test_fingerprint_handles_cycles():
+    first = configuration()
+    first.parameters["self"] = first
+    second = configuration()
+    second.parameters["self"] = second
+    assert config_cache.configuration_fingerprint(
+        first
+    ) == config_cache.configuration_fingerprint(second)
@@ -0,0 +1,199 @@
+from __future__ import annotations  # needed for type annotations in > python 3.7
+
+from typing import Any, Dict, List, Set, Union
+
+from code_generation.configuration import Configuration
+from code_generation.producer import ExtendedVectorProducer, Producer
+from code_generation.quantity import Quantity
+from code_generation.rules import AppendProducer
+from code_generation.systematics import SystematicShift
+
+# evaluate shifts that only change an event weight as additional producers of
+# the nominal event loop, instead of registering them as systematic shifts
+weight_shifts_as_columns = False
+
+
+def _by_scope(config: Dict[Union[str, tuple], Any]) -> Dict[str, Any]:
+    # shift configurations can be given for a single scope or a tuple of scopes
+    by_scope = {}
+    for scopes, value in config.items():
+        for scope in [scopes] if isinstance(scopes, str) else scopes:
+            by_scope[scope] = value
+    return by_scope
+
+
+def is_selected(name: str, shifts: Set[str]) -> bool:
+    """
+    Whether a shift is selected by the lowercase names of the requested
+    shifts.
+    """
+    return "all" in shifts or name.lower() in shifts
+
+
+def weight_column_shifts(configuration: Configuration) -> Set[str]:
+    """
+    Lowercase names of the shifts of an expanded configuration that are
+    written as additional columns, e.g. weight shifts, in the form used to
+    select shifts. These are the shifts of the producers tagged with a
+    weight_shift attribute, see weight_shift_producer.
+    """
+    names = set()
+    for scope_producers in configuration.producers.values():
+        for producer in scope_producers:
+            name = getattr(producer, "weight_shift", None)
+            if name is not None:
+                names.add(name.lower())
+    return names
+
+
+def _shifted_vec_config(
+    configuration: Configuration,
+    producer: ExtendedVectorProducer,
+    name: str,
+    scope: str,
+    parameters: Dict[str, Any],
+) -> str:
+    # the entries of the vector configuration of the shifted copy, with the
+    # shifted entries if the shift changes them, and the output names of the
+    # producer renamed. Producers sharing a vector configuration, e.g. the
+    # vsJet ID of both taus in tt, share the shifted one as well.
+    vec_config = f"{producer.vec_config}__{name}"
+    entries = configuration.config_parameters[scope].get(vec_config)
+    if entries is None:
+        entries = parameters.get(
+            producer.vec_config,
+            configuration.config_parameters[scope][producer.vec_config],
+        )
+    configuration.add_config_parameters(
+        scope,
+        {
+            vec_config: [
+                dict(
+                    entry,
+                    **{producer.outputname: f"{entry[producer.outputname]}__{name}"},
+                )
+                for entry in entries
+            ]
+        },
+    )
+    return vec_config
+
+
+def weight_shift_producer(
+    configuration: Configuration,
+    producer: Producer,
+    name: str,
+    scope: str,
+    parameters: Dict[str, Any],
+) -> Producer:
+    """
+    Copy of a weight producer that evaluates the weight with the shifted
+    parameters. The shifted parameters are renamed to <parameter>__<name> in
+    the call and the outputs are named <output>__<name>, like the outputs of
+    the corresponding systematic shift. For vector producers, the vector
+    configuration is copied to <vec_config>__<name> with renamed output names.
+    The copy is tagged with the name of the shift in its weight_shift
+    attribute.
+    """
+    if type(producer) not in (Producer, ExtendedVectorProducer):
+        raise ValueError(
+            f"{producer.name} is neither a plain nor a vector producer and "
+            + f"cannot be evaluated as weight shift {name}"
+        )
+    call = producer.call
+    for parameter in parameters:
+        call = call.replace(f"{{{parameter}}}", f"{{{parameter}__{name}}}")
+    inputs = producer.input
+    if isinstance(inputs, dict):
+        inputs = inputs[scope]
+    if isinstance(producer, ExtendedVectorProducer):
+        shifted = ExtendedVectorProducer(
+            name=f"{producer.name}__{name}",
+            call=call,
+            input=list(inputs),
+            output=producer.outputname,
+            scope=[scope],
+            vec_config=_shifted_vec_config(
+                configuration, producer, name, scope, parameters
+            ),
+        )
+    else:
+        shifted = Producer(
+            name=f"{producer.name}__{name}",
+            call=call,
+            input=list(inputs),
+            output=[
+                Quantity(f"{quantity.name}__{name}") for quantity in producer.output
+            ],
+            scopes=[scope],
+        )
+    shifted.weight_shift = name
+    return shifted
+
+
+def add_weight_shift(
+    configuration: Configuration,
+    shifts: Set[str],
+    name: str,
+    shift_config: Dict[Union[str, tuple], Dict[str, Any]],
+    producers: Dict[Union[str, tuple], Union[Producer, List[Producer]]],
+    samples: List[str],
+    scopes: Union[List[str], None] = None,
+):
+    """
+    Add a shift that only changes event weights. The arguments are the same as
+    for a SystematicShift and Configuration.add_shift, together with the
+    selected shifts of the configuration.
+
+    If weight_shifts_as_columns is set, the producers of the shift are copied
+    with the shifted parameters and appended to the nominal producers, so the
+    shifted weights are written as additional columns of the nominal output
+    without a shifted copy of the dataframe. The outputs of the producers must
+    not be used as input by any other producer, otherwise the shift would not
+    be propagated. Only plain producers and vector producers are supported.
+    """
+    if not weight_shifts_as_columns:
+        configuration.add_shift(
+            SystematicShift(
+                name=name,
+                shift_config=shift_config,
+                producers=producers,
+                **({} if scopes is None else {"scopes": scopes}),
+            ),
+            samples=samples,
+        )
+        return
+    if not is_selected(name, shifts):
+        return
+    parameters = _by_scope(shift_config)
+    for scope, scope_producers in _by_scope(producers).items():
+        if scope not in configuration.config_parameters:
+            # the scope is not selected for this configuration
+            continue
+        if not isinstance(scope_producers, list):
+            scope_producers = [scope_producers]
+        scope_parameters = parameters.get(scope, {})
+        shifted_producers = [
+            weight_shift_producer(
+                configuration, producer, name, scope, scope_parameters
+            )
+            for producer in scope_producers
+        ]
+        vec_configs = set(
+            producer.vec_config
+            for producer in scope_producers
+            if isinstance(producer, ExtendedVectorProducer)
+        )
+        configuration.add_config_parameters(
+            scope,
+            {
+                f"{parameter}__{name}": value
+                for parameter, value in scope_parameters.items()
+                if parameter not in vec_configs
+            },
+        )
+        # the rule also adds the outputs for the selected samples
+        configuration.add_modification_rule(
+            scope,
+            AppendProducer(producers=shifted_producers, samples=samples),
+        )